@@ -37,12 +37,9 @@ a = Analysis(
     hiddenimports=[
         'flask',
         'flask_cors',
-        'flask_sqlalchemy',
-        'flask_session',
+        'waitress',
+        'orjson',
         'src.routes.ecr',
-        'src.routes.auth',
-        'src.routes.user',
-        'src.models.user',
         # New modular ECR components
         'src.routes.ecr_core',
         'src.routes.serial_comm',
@@ -5,18 +5,35 @@ Script to check ECR library loading and serial port access
 import os
 import sys
 import platform
-import ctypes
-import serial
-import serial.tools.list_ports
+from concurrent.futures import ThreadPoolExecutor
+
+# Loaded library handles keyed by absolute path, so repeated checks reuse
+# the same CDLL instead of reloading it and re-declaring its signatures
+_LIB_CACHE = {}
+
+def load_library(lib_path):
+    """Load the ECR library once and declare its function signatures"""
+    import ctypes
+    from src.routes.ecr_core import bind_library_functions
+
+    cache_key = os.path.abspath(lib_path) if os.path.dirname(lib_path) else lib_path
+    ecr_lib = _LIB_CACHE.get(cache_key)
+    if ecr_lib is None:
+        ecr_lib = ctypes.CDLL(lib_path)
+        bind_library_functions(ecr_lib)
+        _LIB_CACHE[cache_key] = ecr_lib
+    return ecr_lib
 
 def check_library_loading():
     """Check if ECR library can be loaded"""
+    import ctypes
+
     print("=" * 50)
     print("CHECKING ECR LIBRARY LOADING")
     print("=" * 50)
     
     # Determine library name based on platform
-    lib_name = "CimbEcrLibrary.dll" if platform.system() == "Windows" else "libCimbEcrLibrary.so"
+    lib_name = "BriEcrLibrary.dll" if platform.system() == "Windows" else "libBriEcrLibrary.so"
     print(f"Platform: {platform.system()}")
     print(f"Looking for library: {lib_name}")
     
@@ -32,40 +49,60 @@ def check_library_loading():
         lib_name,  # system PATH
     ]
     
+    # One scandir() per distinct directory answers existence for every
+    # candidate in it, instead of probing each path separately
+    dir_entries = {}
+    for path in search_paths:
+        directory = os.path.dirname(path) or "."
+        if directory not in dir_entries:
+            try:
+                with os.scandir(directory) as entries:
+                    dir_entries[directory] = {entry.name: entry for entry in entries}
+            except OSError:
+                dir_entries[directory] = {}
+    
     print(f"\nSearch paths:")
+    lib_path = None
     for i, path in enumerate(search_paths, 1):
-        exists = os.path.exists(path)
-        print(f"  {i}. {path} - {'✓ EXISTS' if exists else '✗ NOT FOUND'}")
-        if exists:
-            # Check file permissions
+        # The entry's stat() feeds the permission and size reports
+        entry = dir_entries[os.path.dirname(path) or "."].get(os.path.basename(path))
+        try:
+            st = entry.stat() if entry else None
+        except OSError:
+            st = None
+        print(f"  {i}. {path} - {'✓ EXISTS' if st else '✗ NOT FOUND'}")
+        if st:
+            if lib_path is None:
+                lib_path = path
+
+            # Check file permissions for this process, not just the mode bits
             readable = os.access(path, os.R_OK)
             executable = os.access(path, os.X_OK)
             print(f"     Readable: {'✓' if readable else '✗'}")
             print(f"     Executable: {'✓' if executable else '✗'}")
             
             # Get file size
-            size = os.path.getsize(path)
-            print(f"     Size: {size} bytes")
+            print(f"     Size: {st.st_size} bytes")
     
     # Try to load the library
     print(f"\nTrying to load library...")
-    lib_path = None
-    for path in search_paths:
-        if os.path.exists(path):
-            lib_path = path
-            break
+
+    # A pre-bound library path skips the search results entirely; the paths
+    # above are then only reported for diagnostics
+    prebound_path = os.environ.get("ECR_LIBRARY_PATH", "")
+    if prebound_path:
+        print(f"Using ECR_LIBRARY_PATH: {prebound_path}")
+        lib_path = prebound_path
     
     if lib_path:
         try:
             print(f"Attempting to load: {lib_path}")
-            ecr_lib = ctypes.CDLL(lib_path)
+            ecr_lib = load_library(lib_path)
             print("✓ Library loaded successfully!")
             
             # Try to get version
             try:
                 version_buf = ctypes.create_string_buffer(20)
-                ecr_lib.ecrGetVersion.argtypes = [ctypes.c_char_p]
-                ecr_lib.ecrGetVersion.restype = None
                 ecr_lib.ecrGetVersion(version_buf)
                 version = version_buf.value.decode('ascii')
                 print(f"✓ Library version: {version}")
@@ -82,8 +119,30 @@ def check_library_loading():
         print(f"✗ {error_msg}")
         return False, error_msg
 
+def probe_serial_port(port):
+    """Try to open and close a serial port; returns (device, accessible, error)"""
+    import serial
+
+    try:
+        ser = serial.Serial(
+            port=port.device,
+            baudrate=9600,
+            bytesize=8,
+            stopbits=1,
+            parity='N',
+            timeout=1
+        )
+        ser.close()
+        return port.device, True, None
+    except serial.SerialException as e:
+        return port.device, False, f"Cannot access {port.device}: {e}"
+    except Exception as e:
+        return port.device, False, f"Unexpected error accessing {port.device}: {e}"
+
 def check_serial_access():
     """Check serial port access"""
+    import serial.tools.list_ports
+
     print("\n" + "=" * 50)
     print("CHECKING SERIAL PORT ACCESS")
     print("=" * 50)
@@ -98,26 +157,19 @@ def check_serial_access():
     for port in ports:
         print(f"  - {port.device}: {port.description}")
     
-    # Try to access each port
+    # Probe all ports concurrently; each open blocks in the driver, so the
+    # total wait is the slowest port rather than the sum of all of them
+    with ThreadPoolExecutor(max_workers=min(16, len(ports))) as executor:
+        results = list(executor.map(probe_serial_port, ports))
+
     accessible_ports = []
-    for port in ports:
-        try:
-            print(f"\nTesting access to {port.device}...")
-            ser = serial.Serial(
-                port=port.device,
-                baudrate=9600,
-                bytesize=8,
-                stopbits=1,
-                parity='N',
-                timeout=1
-            )
-            ser.close()
-            print(f"  ✓ Can access {port.device}")
-            accessible_ports.append(port.device)
-        except serial.SerialException as e:
-            print(f"  ✗ Cannot access {port.device}: {e}")
-        except Exception as e:
-            print(f"  ✗ Unexpected error accessing {port.device}: {e}")
+    for device, accessible, error in results:
+        print(f"\nTesting access to {device}...")
+        if accessible:
+            print(f"  ✓ Can access {device}")
+            accessible_ports.append(device)
+        else:
+            print(f"  ✗ {error}")
     
     if accessible_ports:
         print(f"\n✓ Accessible ports: {', '.join(accessible_ports)}")
@@ -1,56 +1,185 @@
+import functools
+import gc
+import hashlib
+import mimetypes
 import os
+import socket
 import sys
 import webbrowser
 import threading
 import time
-from flask import Flask, send_from_directory
+import orjson
+from flask import Flask, Response, request, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from src.routes.ecr import ecr_bp
+from waitress import serve as waitress_serve
+from src.routes.ecr import ecr_bp, health_body
 
 
+# PyInstaller creates a temp folder and stores path in _MEIPASS
+RESOURCE_BASE_PATH = getattr(sys, "_MEIPASS", None) or os.path.abspath(".")
+
+
+@functools.lru_cache(maxsize=None)
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+    return os.path.join(RESOURCE_BASE_PATH, relative_path)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for request parsing and jsonify"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 
 # Set static folder to work with PyInstaller
 static_path = get_resource_path("src/static")
 app = Flask(__name__, static_folder=static_path)
+app.json = OrjsonProvider(app)
+app.url_map.strict_slashes = False
+
+# Let browsers reuse static assets for an hour and revalidate after that.
+# Passed explicitly per asset so API downloads are never cached.
+STATIC_MAX_AGE = 3600
+
+# Static assets are bundled with the app and do not change while it runs,
+# so resolve them once instead of hitting the filesystem on every request
+STATIC_FILES = frozenset(
+    os.path.relpath(os.path.join(root, name), static_path).replace(os.sep, "/")
+    for root, _dirs, names in os.walk(static_path)
+    for name in names
+)
+HAS_INDEX = "index.html" in STATIC_FILES
+
+
+def build_static_cache(names):
+    """Read static assets into memory with a precomputed content ETag"""
+    cache = {}
+    for name in names:
+        if name not in STATIC_FILES:
+            continue
+        with open(os.path.join(static_path, name), "rb") as f:
+            data = f.read()
+        etag = hashlib.sha256(data).hexdigest()
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        cache[name] = (data, etag, mimetype)
+    return cache
+
+
+STATIC_CACHE = build_static_cache(["qrcode.min.js", "style.css"])
 
 CORS(app, origins=["*"], supports_credentials=True)
 app.register_blueprint(ecr_bp, url_prefix="/api")
 
 
+class HealthMiddleware:
+    """Answer plain GET /api/health probes before Flask dispatches the request"""
+
+    def __init__(self, wsgi_app, path="/api/health"):
+        self.wsgi_app = wsgi_app
+        self.path = path
+
+    def __call__(self, environ, start_response):
+        # Browser requests carry an Origin and still need Flask-CORS headers
+        if (
+            environ.get("PATH_INFO") == self.path
+            and environ.get("REQUEST_METHOD") == "GET"
+            and "HTTP_ORIGIN" not in environ
+        ):
+            body = health_body()
+            start_response(
+                "200 OK",
+                [
+                    ("Content-Type", "application/json"),
+                    ("Content-Length", str(len(body))),
+                ],
+            )
+            return [body]
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = HealthMiddleware(app.wsgi_app)
+
+
+def send_static_asset(name):
+    """Send a static asset from disk with conditional caching"""
+    return send_from_directory(
+        static_path, name, conditional=True, max_age=STATIC_MAX_AGE
+    )
+
+
+def send_cached_asset(name):
+    """Send an in-memory asset, answering repeat requests with 304"""
+    data, etag, mimetype = STATIC_CACHE[name]
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": f'"{etag}"'})
+    return Response(
+        data,
+        mimetype=mimetype,
+        headers={"ETag": f'"{etag}"', "Cache-Control": f"public, max-age={STATIC_MAX_AGE}"},
+    )
+
+
+def send_index():
+    """Send index.html, the fallback for any unknown path"""
+    if HAS_INDEX:
+        # Always revalidate the page shell so an upgraded build shows up at once
+        return send_from_directory(static_path, "index.html", conditional=True, max_age=0)
+    return "index.html not found", 404
+
+
+# Path -> handler table built once, so serve() is a single dict lookup
+STATIC_ROUTES = {name: functools.partial(send_static_asset, name) for name in STATIC_FILES}
+STATIC_ROUTES.update(
+    {name: functools.partial(send_cached_asset, name) for name in STATIC_CACHE}
+)
+STATIC_ROUTES[""] = send_index
+STATIC_ROUTES["index.html"] = send_index
+
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
+    return STATIC_ROUTES.get(path, send_index)()
+
 
-    # Serve requested file or index.html
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, "index.html")
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, "index.html")
-        else:
-            return "index.html not found", 404
+def wait_for_server(host="127.0.0.1", port=5001, timeout=3.0):
+    """Poll until the server accepts connections or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex((host, port)) == 0:
+                return True
+        time.sleep(0.025)
+    return False
 
 
 def open_browser():
-    """Open the default web browser to localhost:5001 after a short delay"""
-    time.sleep(1.5)  # Wait for Flask to start up
+    """Open the default web browser to localhost:5001 once the server is up"""
+    wait_for_server()
     webbrowser.open("http://localhost:5001")
 
 
 if __name__ == "__main__":
     # Start a thread to open the browser after Flask starts
     threading.Thread(target=open_browser, daemon=True).start()
-    app.run(host="0.0.0.0", port=5001, debug=False)
+    # Everything allocated during startup (modules, app, routes) lives for
+    # the whole process; move it out of the collector's view so full
+    # collections during transactions only scan request-time objects
+    gc.collect()
+    gc.freeze()
+    # Serve through waitress so static assets and API calls are handled concurrently;
+    # idle keep-alive connections are held open so the page and its assets share them
+    waitress_serve(
+        app,
+        host="0.0.0.0",
+        port=5001,
+        threads=8,
+        connection_limit=1000,
+        channel_timeout=120,
+        cleanup_interval=30,
+    )
@@ -3,14 +3,21 @@ ECR Simulator Main Module - Refactored with Modular Architecture
 Clean separation of concerns with dedicated modules for different functionalities
 """
 
+import functools
+import io
 import logging
 import os
+import threading
 import time
-from flask import Blueprint, request, jsonify, send_file
+import orjson
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any
+from flask import Blueprint, Response, request, jsonify, send_file
 
 # Import our modular components
 from .ecr_core import EcrCore
-from .serial_comm import SerialComm, get_available_ports
+from .serial_comm import SerialComm, get_cached_ports
 from .socket_comm import SocketComm
 from .ecr_config import EcrConfig, EcrUtils
 from .message_protocol import TransactionProcessor, ConnectionManager
@@ -27,54 +34,142 @@ LOG_FILE_PATH = os.path.join(EXECUTABLE_DIR, "ecr_simulator.log")
 EcrUtils.setup_logging(LOG_FILE_PATH)
 logger = logging.getLogger(__name__)
 
+# Make sure the log exists up front so download_log can serve it directly
+open(LOG_FILE_PATH, "a").close()
+
 # Log initialization paths
-logger.info(f"Executable directory: {EXECUTABLE_DIR}")
-logger.info(f"Log file path: {LOG_FILE_PATH}")
+logger.info("Executable directory: %s", EXECUTABLE_DIR)
+logger.info("Log file path: %s", LOG_FILE_PATH)
+
+# Modular components are built on first use, so importing the blueprint
+# does not load the native library or read settings and history from disk
+_init_lock = threading.RLock()
+
+
+def lazy_component(factory):
+    """Build a component once, on first call, and return it thereafter"""
+    instance = None
+
+    @functools.wraps(factory)
+    def get():
+        nonlocal instance
+        if instance is None:
+            with _init_lock:
+                if instance is None:
+                    instance = factory()
+        return instance
+
+    return get
+
+
+@lazy_component
+def get_config() -> EcrConfig:
+    return EcrConfig(BASE_DIR)
+
+
+@lazy_component
+def get_ecr_core() -> EcrCore:
+    return EcrCore(BASE_DIR)
+
+
+@lazy_component
+def get_serial_comm() -> SerialComm:
+    return SerialComm(get_ecr_core())
+
+
+@lazy_component
+def get_socket_comm() -> SocketComm:
+    return SocketComm(get_ecr_core())  # Pass ecr_core for native socket support
+
+
+@lazy_component
+def get_transaction_processor() -> TransactionProcessor:
+    processor = TransactionProcessor(
+        get_ecr_core(), get_serial_comm(), get_socket_comm(), get_config()
+    )
+    logger.info("ECR Simulator modules initialized successfully")
+    return processor
 
-# Initialize modular components
-config = EcrConfig(BASE_DIR)
-ecr_core = EcrCore(BASE_DIR)
-serial_comm = SerialComm(ecr_core)
-socket_comm = SocketComm(ecr_core)  # Pass ecr_core for native socket support
-transaction_processor = TransactionProcessor(ecr_core, serial_comm, socket_comm, config)
-connection_manager = ConnectionManager(serial_comm, socket_comm, config)
 
-logger.info("ECR Simulator modules initialized successfully")
+@lazy_component
+def get_connection_manager() -> ConnectionManager:
+    # The processor registers the serial response callback, so it must exist
+    # before any connection is opened
+    get_transaction_processor()
+    return ConnectionManager(get_serial_comm(), get_socket_comm(), get_config())
+
+
+def ojsonify(obj: Any, status: int = 200) -> Response:
+    """Build a JSON response with orjson, bypassing flask.jsonify"""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def read_json() -> Any:
+    """Parse the request body with orjson; an empty body reads as {}"""
+    return orjson.loads(request.get_data(cache=False) or b"{}")
+
+
+def transaction_fields(data: dict) -> tuple:
+    """Extract (transaction_type, amount, invoice_no, card_no, add_amount) from a request body"""
+    get = data.get
+    return (
+        get("transaction_type", "SALE"),
+        get("amount", "0.00"),
+        get("invoiceNo", ""),
+        get("cardNo", ""),
+        get("addAmount", "0"),
+    )
+
+
+@ecr_bp.errorhandler(orjson.JSONDecodeError)
+def handle_invalid_json(e):
+    """Reject request bodies that are not valid JSON"""
+    return ojsonify({"error": f"Invalid JSON body: {e}"}, 400)
 
 
 # Flask route handlers
 @ecr_bp.route("/settings", methods=["GET", "POST"])
 def handle_settings():
     """Handle settings management"""
+    config = get_config()
     if request.method == "GET":
-        return jsonify(config.get_settings())
+        # Settings rarely change, so serve the cached body and honour If-None-Match
+        settings_json, etag = config.get_settings_json()
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+        return Response(
+            settings_json, mimetype="application/json", headers={"ETag": f'"{etag}"'}
+        )
 
-    data = request.get_json()
+    data = read_json()
     if data:
         if config.update_settings(data):
             # Update communication modules with new config
             if config.is_serial_mode():
-                serial_comm.update_config(config.get_serial_config())
+                get_serial_comm().update_config(config.get_serial_config())
             else:
-                socket_comm.update_config(config.get_socket_config())
+                get_socket_comm().update_config(config.get_socket_config())
 
-            return jsonify({"status": "success"})
+            return ojsonify({"status": "success"})
         else:
-            return jsonify({"error": "Failed to update settings"}), 500
+            return ojsonify({"error": "Failed to update settings"}, 500)
 
-    return jsonify({"error": "No data"}), 400
+    return ojsonify({"error": "No data"}, 400)
 
 
 @ecr_bp.route("/connection_status", methods=["GET"])
 def get_connection_status():
     """Get current connection status"""
-    return jsonify(connection_manager.get_connection_status())
+    return ojsonify(get_connection_manager().get_connection_status())
 
 
 @ecr_bp.route("/connect", methods=["POST"])
 def handle_connection():
     """Handle connection/disconnection requests"""
-    data = request.get_json()
+    config = get_config()
+    transaction_processor = get_transaction_processor()
+    connection_manager = get_connection_manager()
+    data = read_json()
     action = data.get("action", "connect")
 
     try:
@@ -119,42 +214,34 @@ def handle_connection():
 @ecr_bp.route("/build_request", methods=["POST"])
 def build_request():
     """Build a human-readable transaction request"""
+    data = read_json()
     try:
-        data = request.get_json()
-        transaction_type = data.get("transaction_type", "SALE")
-        amount = data.get("amount", "0.00")
-        invoice_no = data.get("invoiceNo", "")
-        card_no = data.get("cardNo", "")
-        add_amount = data.get("addAmount", "0")
-
-        result = transaction_processor.build_request(
+        transaction_type, amount, invoice_no, card_no, add_amount = transaction_fields(data)
+
+        result = get_transaction_processor().build_request(
             transaction_type, amount, invoice_no, card_no, add_amount
         )
         return jsonify(result)
 
     except ValueError as e:
-        logger.error(f"Build request error: {str(e)}")
+        logger.error("Build request error: %s", e)
         return jsonify({"error": str(e)}), 400
 
 
 @ecr_bp.route("/process", methods=["POST"])
 def process_transaction():
     """Process a transaction"""
+    data = read_json()
     try:
-        data = request.get_json()
-        transaction_type = data.get("transaction_type", "SALE")
-        amount = data.get("amount", "0.00")
-        invoice_no = data.get("invoiceNo", "")
-        card_no = data.get("cardNo", "")
-        add_amount = data.get("addAmount", "0")
-
-        result = transaction_processor.process_transaction(
+        transaction_type, amount, invoice_no, card_no, add_amount = transaction_fields(data)
+
+        result = get_transaction_processor().process_transaction(
             transaction_type, amount, invoice_no, card_no, add_amount, user_id=None
         )
         return jsonify(result)
 
     except Exception as e:
-        logger.error(f"Process transaction error: {str(e)}")
+        logger.error("Process transaction error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -162,55 +249,74 @@ def process_transaction():
 def get_transaction_status(trx_id):
     """Get transaction status by ID"""
     try:
-        status_info = transaction_processor.get_transaction_status(trx_id)
-        return jsonify(status_info)
+        status_info = get_transaction_processor().get_transaction_status(trx_id)
+        return ojsonify(status_info)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 404
+        return ojsonify({"error": str(e)}, 404)
 
 
 @ecr_bp.route("/history", methods=["GET"])
 def get_history():
     """Get transaction history"""
-    history_list = []
-    visible_history = config.get_visible_transaction_history(user_id=None)
-
-    for trx_id, data in visible_history.items():
-        history_item = EcrUtils.format_transaction_for_history(trx_id, data)
-        history_list.append(history_item)
-
-    # Sort by timestamp, most recent first
-    history_list.sort(key=lambda x: x["timestamp"], reverse=True)
-    return jsonify(history_list)
+    # Items are formatted and sorted (most recent first) as transactions change
+    return ojsonify(get_config().get_history_items(user_id=None))
 
 
 @ecr_bp.route("/history", methods=["DELETE"])
 def clear_history():
     """Clear transaction history from UI display"""
-    config.clear_ui_transaction_history(user_id=None)
+    get_config().clear_ui_transaction_history(user_id=None)
     return jsonify(
         {"status": "success", "message": "Transaction history cleared from display"}
     )
 
 
-@ecr_bp.route("/detect_serial", methods=["POST"])
-def detect_serial():
-    """Try to detect the correct EDC serial number"""
-    try:
-        if not config.get_setting("enable_rest_api", False):
-            return jsonify({"error": "REST API mode not enabled"}), 400
+# The serial detection currently in flight, shared by concurrent callers
+_detect_lock = threading.Lock()
+_detect_future = None
+
 
+def detect_serial_number() -> dict:
+    """Run serial number detection, joining a detection already in progress"""
+    global _detect_future
+    with _detect_lock:
+        future = _detect_future
+        owner = future is None
+        if owner:
+            future = _detect_future = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        config = get_config()
+        socket_comm = get_socket_comm()
         socket_comm.update_config(config.get_socket_config())
         result = socket_comm.auto_detect_serial_number()
-
         if result.get("status") == "success":
             # Update settings with working serial
             working_serial = result.get("working_serial")
             config.set_setting("edc_serial_number", working_serial)
+        future.set_result(result)
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with _detect_lock:
+            _detect_future = None
+    return future.result()
 
-        return jsonify(result)
+
+@ecr_bp.route("/detect_serial", methods=["POST"])
+def detect_serial():
+    """Try to detect the correct EDC serial number"""
+    try:
+        if not get_config().get_setting("enable_rest_api", False):
+            return jsonify({"error": "REST API mode not enabled"}), 400
+
+        # Concurrent requests (e.g. two open tabs) share a single detection run
+        return jsonify(detect_serial_number())
 
     except Exception as e:
-        logger.error(f"Serial detection error: {str(e)}")
+        logger.error("Serial detection error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -218,19 +324,17 @@ def detect_serial():
 def get_serial_ports():
     """Get available serial ports"""
     try:
-        ports = get_available_ports()
-        return jsonify({"ports": ports})
+        ports = get_cached_ports()
+        return ojsonify({"ports": ports})
     except Exception as e:
-        logger.error(f"Error getting serial ports: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error getting serial ports: %s", e)
+        return ojsonify({"error": str(e)}, 500)
 
 
 @ecr_bp.route("/download_log", methods=["GET"])
 def download_log():
     """Download the ECR simulator log file"""
     try:
-        from datetime import datetime
-
         # Check password parameter
         password = request.args.get("password", "")
         if not EcrUtils.validate_daily_password(password):
@@ -243,23 +347,18 @@ def download_log():
                 401,
             )
 
-        # Create log file if it doesn't exist
-        if not os.path.exists(LOG_FILE_PATH):
-            with open(LOG_FILE_PATH, "w") as f:
-                f.write(
-                    f"ECR Simulator Log - Created {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                )
-            logger.info(f"Created new log file at: {LOG_FILE_PATH}")
-
+        # conditional=True lets clients revalidate or resume with Range requests
         return send_file(
             LOG_FILE_PATH,
             as_attachment=True,
             download_name="ecr_simulator.log",
             mimetype="text/plain",
+            conditional=True,
+            max_age=0,
         )
 
     except Exception as e:
-        logger.error(f"Download log error: {str(e)}")
+        logger.error("Download log error: %s", e)
         return jsonify({"error": f"Could not create/download log file: {str(e)}"}), 500
 
 
@@ -267,10 +366,6 @@ def download_log():
 def download_history():
     """Download the transaction history JSON file"""
     try:
-        from datetime import datetime
-        import json
-        import tempfile
-
         # Check password parameter
         password = request.args.get("password", "")
         if not EcrUtils.validate_daily_password(password):
@@ -283,58 +378,98 @@ def download_history():
                 401,
             )
 
-        # Get all transaction history
-        all_history = config.get_transaction_history()
-
-        # Create a temporary file with history
-        temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
-        json.dump(all_history, temp_file, indent=2)
-        temp_file.close()
-
+        # Serialize the whole history in one orjson call and serve it from memory
         return send_file(
-            temp_file.name,
+            io.BytesIO(get_config().export_pretty()),
             as_attachment=True,
             download_name="transaction_history.json",
             mimetype="application/json",
+            max_age=0,
         )
 
     except Exception as e:
-        logger.error(f"Download history error: {str(e)}")
+        logger.error("Download history error: %s", e)
         return (
             jsonify({"error": f"Could not create/download history file: {str(e)}"}),
             500,
         )
 
 
+# Component accessors reported by /health, and the fixed part of /module_info
+COMPONENTS = {
+    "ecr_core": get_ecr_core,
+    "serial_comm": get_serial_comm,
+    "socket_comm": get_socket_comm,
+    "config": get_config,
+    "transaction_processor": get_transaction_processor,
+    "connection_manager": get_connection_manager,
+}
+MODULE_INFO_STATIC = {
+    "original_file_size_reduced": "~1800 lines -> ~200 lines + 5 modules",
+    "benefits": [
+        "Separated concerns",
+        "Better maintainability",
+        "Easier testing",
+        "Cleaner code organization",
+        "Modular development",
+    ],
+}
+
+# Serialized /health bodies up to the timestamp value, one per
+# (connection active, mode) pair, and the timestamp of the current second
+_health_prefixes = {}
+_health_timestamp = (0, b"")
+
+
+def health_prefix(active: bool, mode: str) -> bytes:
+    """Get the serialized /health body for a connection state, minus its timestamp"""
+    prefix = _health_prefixes.get((active, mode))
+    if prefix is None:
+        body = orjson.dumps(
+            {
+                "status": "healthy",
+                "modules": {name: get() is not None for name, get in COMPONENTS.items()},
+                "connection": {"active": active, "mode": mode},
+            }
+        )
+        prefix = body[:-1] + b',"timestamp":"'
+        _health_prefixes[(active, mode)] = prefix
+    return prefix
+
+
+def health_timestamp() -> bytes:
+    """Get the current time for /health, formatted at most once per second"""
+    global _health_timestamp
+    second = int(time.time())
+    if _health_timestamp[0] != second:
+        now = datetime.fromtimestamp(second).isoformat(sep=" ", timespec="seconds")
+        _health_timestamp = (second, now.encode())
+    return _health_timestamp[1]
+
+
+def health_body() -> bytes:
+    """Get the serialized /health response body"""
+    prefix = health_prefix(
+        get_connection_manager().is_connection_active(),
+        get_config().get_communication_mode(),
+    )
+    return prefix + health_timestamp() + b'"}'
+
+
 # Health check endpoint
 @ecr_bp.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify(
-        {
-            "status": "healthy",
-            "modules": {
-                "ecr_core": ecr_core is not None,
-                "serial_comm": serial_comm is not None,
-                "socket_comm": socket_comm is not None,
-                "config": config is not None,
-                "transaction_processor": transaction_processor is not None,
-                "connection_manager": connection_manager is not None,
-            },
-            "connection": {
-                "active": connection_manager.is_connection_active(),
-                "mode": config.get_communication_mode(),
-            },
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-    )
+    return Response(health_body(), mimetype="application/json")
 
 
 # Module information endpoint
 @ecr_bp.route("/module_info", methods=["GET"])
 def module_info():
     """Get information about loaded modules"""
-    return jsonify(
+    config = get_config()
+    ecr_core = get_ecr_core()
+    return ojsonify(
         {
             "architecture": "modular",
             "modules": {
@@ -345,12 +480,13 @@ def module_info():
                 },
                 "serial_comm": {
                     "description": "Serial communication handling",
-                    "connected": serial_comm.is_connected,
-                    "use_pyserial_fallback": serial_comm.use_pyserial_listener,
+                    "connected": get_serial_comm().is_connected,
+                    # SerialComm always listens through PySerial
+                    "use_pyserial_fallback": True,
                 },
                 "socket_comm": {
                     "description": "Socket and REST API communication",
-                    "connected": socket_comm.is_connected,
+                    "connected": get_socket_comm().is_connected,
                 },
                 "config": {
                     "description": "Configuration and settings management",
@@ -359,17 +495,10 @@ def module_info():
                 },
                 "message_protocol": {
                     "description": "Transaction processing and protocol handling",
-                    "connection_active": connection_manager.is_connection_active(),
+                    "connection_active": get_connection_manager().is_connection_active(),
                 },
             },
-            "original_file_size_reduced": "~1800 lines -> ~200 lines + 5 modules",
-            "benefits": [
-                "Separated concerns",
-                "Better maintainability",
-                "Easier testing",
-                "Cleaner code organization",
-                "Modular development",
-            ],
+            **MODULE_INFO_STATIC,
         }
     )
 
@@ -3,16 +3,39 @@ ECR Configuration and Utilities Module
 Handles settings management, logging configuration, and utility functions
 """
 
-import json
+import atexit
+import bisect
+import functools
+import hashlib
+import hmac
+import itertools
+import mmap
 import os
+import queue
+import secrets
 import sys
 import logging
+import threading
 import time
-from typing import Dict, Any, Optional
-from datetime import datetime
+import orjson
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# History writes are batched: the flusher appends to the log once per
+# interval, or sooner when this many updates are pending
+HISTORY_FLUSH_INTERVAL = 0.05
+HISTORY_FLUSH_BATCH = 32
+# The history log is compacted into the snapshot once it grows past this
+# multiple of the snapshot size (and past HISTORY_LOG_MIN_COMPACT bytes)
+HISTORY_LOG_COMPACT_RATIO = 2
+HISTORY_LOG_MIN_COMPACT = 64 * 1024
+# History snapshots larger than this are parsed straight from a memory map
+HISTORY_MMAP_THRESHOLD = 1_000_000
+
 
 class EcrConfig:
     """ECR Configuration Management"""
@@ -21,22 +44,59 @@ class EcrConfig:
         self.base_dir = base_dir
         self.settings_file = os.path.join(base_dir, "settings.json")
         self.history_file = os.path.join(base_dir, "transaction_history.json")
+        # Changes since the last snapshot, one JSON record per line
+        self.history_log_file = os.path.join(base_dir, "transaction_history.jsonl")
         self.app_settings = {}
         self.transaction_history = {}
         self.ui_hidden_transactions = set()
+        # Serialized settings and their ETag, rebuilt after each update
+        self._settings_json = None
+        self._settings_etag = None
+        # Formatted history items for the UI, kept sorted as transactions
+        # change so reads need no per-request formatting or sorting
+        self._history_lock = threading.Lock()
+        self._history_items = {}
+        self._history_keys = {}
+        self._history_order = []
+        self._history_seq = 0
+        # Transactions grouped by owning user_id (trx_id -> data per user)
+        self._history_by_user = defaultdict(dict)
+        # Timestamps of transactions still awaiting a response (trx_id -> timestamp)
+        self._processing = {}
+        # Transaction IDs waiting to be written by the background flusher
+        self._dirty_queue = queue.Queue()
+        self._history_dirty = False
+        self._closed = False
+        self._save_lock = threading.Lock()
+        self._log_fp = None
+        self._log_size = 0
+        self._snapshot_size = 0
 
         self._load_settings()
         self._load_transaction_history()
+        for trx_id in self.transaction_history:
+            self._track_user(trx_id)
+            self._track_status(trx_id)
+            self._index_transaction(trx_id)
+        if self._log_size:
+            # Fold the replayed log into a fresh snapshot so appends start clean
+            self.save_transaction_history()
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="history-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
 
     def _load_settings(self):
         """Load application settings from JSON file"""
         if os.path.exists(self.settings_file):
             try:
-                with open(self.settings_file, "r") as f:
-                    self.app_settings = json.load(f)
-                logger.info(f"Settings loaded: {self.app_settings}")
+                with open(self.settings_file, "rb") as f:
+                    self.app_settings = orjson.loads(f.read())
+                logger.info("Settings loaded: %s", self.app_settings)
             except Exception as e:
-                logger.error(f"Error loading settings: {e}")
+                logger.error("Error loading settings: %s", e)
                 self.app_settings = {}
         else:
             logger.info("No settings file found, using defaults")
@@ -45,31 +105,74 @@ class EcrConfig:
         """Load transaction history from JSON file"""
         if os.path.exists(self.history_file):
             try:
-                with open(self.history_file, "r") as f:
-                    self.transaction_history = json.load(f)
+                with open(self.history_file, "rb") as f:
+                    self._snapshot_size = os.fstat(f.fileno()).st_size
+                    if self._snapshot_size > HISTORY_MMAP_THRESHOLD:
+                        # Let the parser read the page cache directly instead
+                        # of copying the whole file into a bytes object first
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            with memoryview(mm) as view:
+                                self.transaction_history = orjson.loads(view)
+                    else:
+                        self.transaction_history = orjson.loads(f.read())
                 logger.info(
-                    f"Transaction history loaded: {len(self.transaction_history)} transactions"
+                    "Transaction history loaded: %s transactions",
+                    len(self.transaction_history),
                 )
             except Exception as e:
-                logger.error(f"Error loading transaction history: {e}")
+                logger.error("Error loading transaction history: %s", e)
                 self.transaction_history = {}
         else:
             logger.info("No existing transaction history file found")
+        self._replay_history_log()
+
+    def _replay_history_log(self):
+        """Apply changes appended to the history log since the last snapshot"""
+        if not os.path.exists(self.history_log_file):
+            return
+        replayed = 0
+        try:
+            with open(self.history_log_file, "rb") as f:
+                for line in f:
+                    self._log_size += len(line)
+                    try:
+                        record = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # A crash mid-append can leave a partial last line
+                        logger.warning("Skipping unreadable history log entry")
+                        continue
+                    if record.get("op") == "put":
+                        self.transaction_history[record["id"]] = record["data"]
+                        replayed += 1
+            logger.info("Replayed %s transaction history log entries", replayed)
+        except Exception as e:
+            logger.error("Error replaying transaction history log: %s", e)
 
-    def get_settings(self) -> Dict[str, Any]:
-        """Get current application settings"""
-        return self.app_settings.copy()
+    def get_settings(self) -> Mapping[str, Any]:
+        """Get a read-only view of the current application settings"""
+        return MappingProxyType(self.app_settings)
+
+    def get_settings_json(self) -> Tuple[bytes, str]:
+        """Get current settings serialized as JSON, with a content ETag"""
+        if self._settings_json is None:
+            settings_json = orjson.dumps(self.app_settings)
+            self._settings_etag = hashlib.sha1(settings_json).hexdigest()
+            self._settings_json = settings_json
+        return self._settings_json, self._settings_etag
 
     def update_settings(self, new_settings: Dict[str, Any]) -> bool:
         """Update application settings"""
         try:
             self.app_settings.update(new_settings)
-            with open(self.settings_file, "w") as f:
-                json.dump(self.app_settings, f, indent=2)
-            logger.info(f"Settings updated: {new_settings}")
+            self._settings_json = None
+            # Settings stay indented so the file remains easy to edit by hand
+            self._write_atomic(
+                self.settings_file, orjson.dumps(self.app_settings, option=orjson.OPT_INDENT_2)
+            )
+            logger.info("Settings updated: %s", new_settings)
             return True
         except Exception as e:
-            logger.error(f"Error saving settings: {e}")
+            logger.error("Error saving settings: %s", e)
             return False
 
     def get_setting(self, key: str, default: Any = None) -> Any:
@@ -80,9 +183,14 @@ class EcrConfig:
         """Set a specific setting value"""
         return self.update_settings({key: value})
 
-    def get_transaction_history(self) -> Dict[str, Any]:
-        """Get transaction history"""
-        return self.transaction_history.copy()
+    def get_transaction_history(self) -> Mapping[str, Any]:
+        """Get a read-only view of the transaction history"""
+        return MappingProxyType(self.transaction_history)
+
+    def export_pretty(self) -> bytes:
+        """Get the transaction history as indented JSON for people to read"""
+        # The snapshot on disk is compact; exports keep the readable layout
+        return orjson.dumps(self.transaction_history, option=orjson.OPT_INDENT_2)
 
     def add_transaction(self, trx_id: str, transaction_data: Dict[str, Any], user_id: Optional[int] = None) -> bool:
         """Add a transaction to history"""
@@ -90,72 +198,295 @@ class EcrConfig:
             # Add user_id to transaction data if provided
             if user_id is not None:
                 transaction_data['user_id'] = user_id
+            previous = self.transaction_history.get(trx_id)
             self.transaction_history[trx_id] = transaction_data
-            self.save_transaction_history()
+            self._track_user(trx_id, previous.get('user_id') if previous else None)
+            self._track_status(trx_id)
+            self._index_transaction(trx_id)
+            self._mark_history_dirty(trx_id)
             return True
         except Exception as e:
-            logger.error(f"Error adding transaction: {e}")
+            logger.error("Error adding transaction: %s", e)
             return False
 
     def update_transaction(self, trx_id: str, updates: Dict[str, Any]) -> bool:
         """Update an existing transaction"""
         try:
             if trx_id in self.transaction_history:
+                previous_user_id = self.transaction_history[trx_id].get("user_id")
                 self.transaction_history[trx_id].update(updates)
-                self.save_transaction_history()
+                self._track_user(trx_id, previous_user_id)
+                self._track_status(trx_id)
+                self._index_transaction(trx_id)
+                self._mark_history_dirty(trx_id)
                 return True
             else:
-                logger.error(f"Transaction {trx_id} not found")
+                logger.error("Transaction %s not found", trx_id)
                 return False
         except Exception as e:
-            logger.error(f"Error updating transaction: {e}")
+            logger.error("Error updating transaction: %s", e)
             return False
 
     def get_transaction(self, trx_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific transaction"""
         return self.transaction_history.get(trx_id)
 
+    def get_latest_processing_transaction(self) -> Optional[str]:
+        """Get the ID of the most recent transaction still awaiting a response"""
+        processing = list(self._processing.items())
+        if not processing:
+            return None
+        return max(processing, key=lambda item: item[1])[0]
+
+    def _track_user(self, trx_id: str, previous_user_id: Optional[int] = None):
+        """Keep the per-user index in step with a transaction's user_id"""
+        data = self.transaction_history[trx_id]
+        user_id = data.get("user_id")
+        if previous_user_id is not None and previous_user_id != user_id:
+            self._history_by_user[previous_user_id].pop(trx_id, None)
+        if user_id is not None:
+            self._history_by_user[user_id][trx_id] = data
+
+    def _track_status(self, trx_id: str):
+        """Keep the processing-transaction index in step with a transaction's status"""
+        data = self.transaction_history[trx_id]
+        if data.get("status") == "processing":
+            self._processing[trx_id] = data["timestamp"]
+        else:
+            self._processing.pop(trx_id, None)
+
     def save_transaction_history(self) -> bool:
-        """Save transaction history to JSON file"""
+        """Save transaction history to JSON file and empty the history log"""
         try:
-            with open(self.history_file, "w") as f:
-                json.dump(self.transaction_history, f, indent=2)
+            with self._save_lock:
+                self._history_dirty = False
+                # Copy two levels deep so request threads can keep adding
+                # and updating transactions while this snapshot is dumped
+                snapshot = {
+                    trx_id: dict(data)
+                    for trx_id, data in dict(self.transaction_history).items()
+                }
+                snapshot_json = orjson.dumps(snapshot)
+                self._write_atomic(self.history_file, snapshot_json)
+                self._snapshot_size = len(snapshot_json)
+                # Everything in the log is now part of the snapshot
+                if self._log_fp is not None:
+                    self._log_fp.truncate(0)
+                elif os.path.exists(self.history_log_file):
+                    open(self.history_log_file, "wb").close()
+                self._log_size = 0
             logger.debug("Transaction history saved to file")
             return True
         except Exception as e:
-            logger.error(f"Error saving transaction history: {e}")
+            logger.error("Error saving transaction history: %s", e)
             return False
 
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        """Replace a file's contents so readers see either the old or new file"""
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    def _append_history_log(self, trx_ids) -> bool:
+        """Append the current state of the given transactions to the history log"""
+        try:
+            with self._save_lock:
+                self._history_dirty = False
+                # Serialize under the lock so a record can never be older than
+                # a snapshot written after it
+                records = b"".join(
+                    orjson.dumps(
+                        {"op": "put", "id": trx_id, "data": dict(self.transaction_history[trx_id])}
+                    )
+                    + b"\n"
+                    for trx_id in trx_ids
+                )
+                # The log stays open between batches; close() releases it
+                if self._log_fp is None:
+                    self._log_fp = open(self.history_log_file, "ab")
+                self._log_fp.write(records)
+                self._log_fp.flush()
+                if self.app_settings.get("history_fsync", False):
+                    # Opt-in durability: survive power loss, at one fsync per batch
+                    os.fsync(self._log_fp.fileno())
+                self._log_size += len(records)
+                compact = self._log_size > max(
+                    HISTORY_LOG_MIN_COMPACT, HISTORY_LOG_COMPACT_RATIO * self._snapshot_size
+                )
+        except Exception as e:
+            logger.error("Error appending to transaction history log: %s", e)
+            return False
+        if compact:
+            return self.save_transaction_history()
+        return True
+
+    def _mark_history_dirty(self, trx_id: str):
+        """Queue a changed transaction for the background flusher"""
+        self._history_dirty = True
+        if self._closed:
+            # No flusher after close(), so write straight through
+            self.save_transaction_history()
+        else:
+            self._dirty_queue.put(trx_id)
+
+    def _drain_dirty_queue(self) -> set:
+        """Take all queued transaction IDs off the dirty queue"""
+        drained = set()
+        while True:
+            try:
+                trx_id = self._dirty_queue.get_nowait()
+            except queue.Empty:
+                drained.discard(None)
+                return drained
+            drained.add(trx_id)
+
+    def _flush_loop(self):
+        """Background thread writing queued history updates in batches"""
+        while not self._closed:
+            trx_id = self._dirty_queue.get()
+            if trx_id is None:
+                break
+            pending = {trx_id}
+            # Count every queued update, not just distinct transactions, so a
+            # burst of updates to one transaction also triggers an early flush
+            queued = 1
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+            while queued < HISTORY_FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    trx_id = self._dirty_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if trx_id is None:
+                    break
+                pending.add(trx_id)
+                queued += 1
+            pending |= self._drain_dirty_queue()
+            self._append_history_log(pending)
+            logger.debug("Flushed %s queued history updates", len(pending))
+
+    def flush_sync(self) -> bool:
+        """Write any queued history updates to disk immediately"""
+        # The flusher may be holding IDs it has not written yet, so write a
+        # full snapshot rather than only the IDs still queued
+        if not self._drain_dirty_queue() and not self._history_dirty:
+            return True
+        return self.save_transaction_history()
+
+    def close(self):
+        """Write pending history updates and stop the background flusher"""
+        if self._closed:
+            return
+        self._closed = True
+        self._dirty_queue.put(None)
+        self._flusher.join(timeout=5)
+        self.flush_sync()
+        with self._save_lock:
+            if self._log_fp is not None:
+                self._log_fp.close()
+                self._log_fp = None
+
     def clear_ui_transaction_history(self, user_id: Optional[int] = None):
         """Clear transaction history from UI display only"""
         if user_id is not None:
             # Only hide transactions belonging to this user
-            user_transactions = [trx_id for trx_id, data in self.transaction_history.items()
-                               if data.get('user_id') == user_id]
-            self.ui_hidden_transactions.update(user_transactions)
+            user_transactions = list(self._history_by_user.get(user_id, {}))
+            self._hide_transactions(user_transactions)
             logger.info(
-                f"Transaction history cleared from UI for user {user_id} ({len(user_transactions)} transactions hidden)"
+                "Transaction history cleared from UI for user %s (%s transactions hidden)",
+                user_id,
+                len(user_transactions),
             )
         else:
             # Hide all transactions (backward compatibility)
-            self.ui_hidden_transactions.update(self.transaction_history.keys())
+            all_transactions = list(self.transaction_history)
+            self._hide_transactions(all_transactions)
             logger.info(
-                f"Transaction history cleared from UI ({len(self.transaction_history)} transactions hidden)"
+                "Transaction history cleared from UI (%s transactions hidden)",
+                len(all_transactions),
             )
 
+    def _index_transaction(self, trx_id: str):
+        """Insert or refresh a transaction's formatted item in the sorted history index"""
+        if trx_id in self.ui_hidden_transactions:
+            return
+        item = EcrUtils.format_transaction_for_history(
+            trx_id, self.transaction_history[trx_id]
+        )
+        with self._history_lock:
+            # Re-check under the lock: a clear may have hidden it meanwhile
+            if trx_id in self.ui_hidden_transactions:
+                return
+            old_key = self._history_keys.get(trx_id)
+            if old_key is not None:
+                # Keep the original insertion sequence so ties stay in history order
+                seq = old_key[1]
+                del self._history_order[bisect.bisect_left(self._history_order, old_key)]
+            else:
+                self._history_seq += 1
+                seq = -self._history_seq
+            key = (item["timestamp"], seq, trx_id)
+            bisect.insort(self._history_order, key)
+            self._history_keys[trx_id] = key
+            self._history_items[trx_id] = item
+
+    def _hide_transactions(self, trx_ids: List[str]):
+        """Hide transactions from the UI and drop them from the history index"""
+        with self._history_lock:
+            # Hide and unindex together so a concurrent _index_transaction
+            # can't put a transaction back between the two steps
+            self.ui_hidden_transactions.update(trx_ids)
+            self._unindex_transactions(trx_ids)
+
+    def _unindex_transactions(self, trx_ids: List[str]):
+        """Remove transactions from the sorted history index (hold _history_lock)"""
+        # Work out and drop the order entries before touching the dicts, so
+        # a failure part-way can't leave order keys without their items
+        removed = {
+            self._history_keys[trx_id]
+            for trx_id in trx_ids
+            if trx_id in self._history_keys
+        }
+        if len(removed) == 1:
+            (key,) = removed
+            del self._history_order[bisect.bisect_left(self._history_order, key)]
+        elif removed:
+            # One filtering pass instead of a list deletion per key
+            self._history_order = [
+                key for key in self._history_order if key not in removed
+            ]
+        for trx_id in trx_ids:
+            if self._history_keys.pop(trx_id, None) is not None:
+                del self._history_items[trx_id]
+
+    def get_history_items(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get formatted visible history items, most recent first"""
+        with self._history_lock:
+            items = [self._history_items[key[2]] for key in reversed(self._history_order)]
+        if user_id is not None:
+            user_history = self._history_by_user.get(user_id, {})
+            items = [item for item in items if item["id"] in user_history]
+        return items
+
     def get_visible_transaction_history(self, user_id: Optional[int] = None) -> Dict[str, Any]:
         """Get transaction history visible to UI"""
-        visible = {}
-        for trx_id, data in self.transaction_history.items():
-            if trx_id not in self.ui_hidden_transactions:
-                # Filter by user_id if provided
-                if user_id is not None:
-                    if data.get('user_id') == user_id:
-                        visible[trx_id] = data
-                else:
-                    # Return all visible transactions (backward compatibility)
-                    visible[trx_id] = data
-        return visible
+        if user_id is not None:
+            # Only scan this user's transactions
+            history = self._history_by_user.get(user_id, {})
+        else:
+            # Return all visible transactions (backward compatibility)
+            history = self.transaction_history
+        return {
+            trx_id: data
+            for trx_id, data in history.items()
+            if trx_id not in self.ui_hidden_transactions
+        }
 
     def get_communication_mode(self) -> str:
         """Get current communication mode"""
@@ -192,10 +523,85 @@ class EcrConfig:
         }
 
 
+# Transaction names and their codes - BRI FMS v3.3 (0x01 to 0x1E)
+TRANSACTION_TYPE_CODES = {
+    "SALE": "01",
+    "INSTALLMENT": "02",
+    "VOID": "03",
+    "GENERATE QR": "04",
+    "QRIS STATUS TRANSAKSI": "05",
+    "QRIS REFUND": "06",
+    "INFO SALDO BRIZZI": "07",
+    "PEMBAYARAN BRIZZI": "08",
+    "TOPUP BRIZZI TERTUNDA": "09",
+    "TOPUP BRIZZI ONLINE": "0A",
+    "UPDATE SALDO TERTUNDA BRIZZI": "0B",
+    "VOID BRIZZI": "0C",
+    "FARE NON-FARE": "0D",
+    "CONTACTLESS": "0E",
+    "SALE TIP": "0F",
+    "KEY IN": "10",
+    "LOGON": "11",
+    "SETTLEMENT": "12",
+    "SETTLEMENT BRIZZI": "13",
+    "REPRINT TRANSAKSI TERAKHIR": "14",
+    "REPRINT TRANSAKSI": "15",
+    "DETAIL REPORT": "16",
+    "SUMMARY REPORT": "17",
+    "REPRINT BRIZZI TRANSAKSI TERAKHIR": "18",
+    "REPRINT BRIZZI TRANSAKSI": "19",
+    "BRIZZI DETAIL REPORT": "1A",
+    "BRIZZI SUMMARY REPORT": "1B",
+    "QRIS DETAIL REPORT": "1C",
+    "QRIS SUMMARY REPORT": "1D",
+    "INFO KARTU BRIZZI": "1E",
+}
+TRANSACTION_CODE_NAMES = {code: name for name, code in TRANSACTION_TYPE_CODES.items()}
+
+# Transactions that don't require amount: VOID, INFO SALDO, SETTLEMENT, REPRINT, REPORT, LOGON
+NO_AMOUNT_TRANSACTION_TYPES = frozenset(
+    {
+        "VOID",
+        "INFO SALDO BRIZZI",
+        "VOID BRIZZI",
+        "LOGON",
+        "SETTLEMENT",
+        "SETTLEMENT BRIZZI",
+        "REPRINT TRANSAKSI TERAKHIR",
+        "REPRINT TRANSAKSI",
+        "DETAIL REPORT",
+        "SUMMARY REPORT",
+        "REPRINT BRIZZI TRANSAKSI TERAKHIR",
+        "REPRINT BRIZZI TRANSAKSI",
+        "BRIZZI DETAIL REPORT",
+        "BRIZZI SUMMARY REPORT",
+        "QRIS DETAIL REPORT",
+        "QRIS SUMMARY REPORT",
+        "INFO KARTU BRIZZI",
+    }
+)
+
+# Entry mode descriptions - BRI FMS v3.3 spec
+ENTRY_MODE_DESCRIPTIONS = {
+    "D": "Dip (EMV Chip)",
+    "S": "Swipe (Magnetic Stripe)",
+    "F": "Fallback",
+    "M": "Manual (Key In)",
+    "T": "Tap (Contactless)",
+    "`": "QRIS MPM",  # 0x60
+}
+
+
 class EcrUtils:
     """ECR Utility Functions"""
 
+    # Today's download password and the timestamp of the midnight it expires at
+    _daily_password = (0.0, b"")
+    # Transaction ID sequence, starting at a random 32-bit value per process
+    _transaction_ids = itertools.count(secrets.randbits(32))
+
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_executable_dir() -> str:
         """Get the directory where the executable or script is located"""
         if getattr(sys, "frozen", False):
@@ -220,80 +626,21 @@ class EcrUtils:
         )
 
         # Also log the paths for debugging
-        logger.info(f"Log file path: {log_file_path}")
+        logger.info("Log file path: %s", log_file_path)
 
     @staticmethod
     def get_transaction_name_from_code(trans_code: str) -> str:
         """Convert transaction code to human-readable name - BRI FMS v3.3"""
-        code_to_name_map = {
-            "01": "SALE",
-            "02": "INSTALLMENT",
-            "03": "VOID",
-            "04": "GENERATE QR",
-            "05": "QRIS STATUS TRANSAKSI",
-            "06": "QRIS REFUND",
-            "07": "INFO SALDO BRIZZI",
-            "08": "PEMBAYARAN BRIZZI",
-            "09": "TOPUP BRIZZI TERTUNDA",
-            "0A": "TOPUP BRIZZI ONLINE",
-            "0B": "UPDATE SALDO TERTUNDA BRIZZI",
-            "0C": "VOID BRIZZI",
-            "0D": "FARE NON-FARE",
-            "0E": "CONTACTLESS",
-            "0F": "SALE TIP",
-            "10": "KEY IN",
-            "11": "LOGON",
-            "12": "SETTLEMENT",
-            "13": "SETTLEMENT BRIZZI",
-            "14": "REPRINT TRANSAKSI TERAKHIR",
-            "15": "REPRINT TRANSAKSI",
-            "16": "DETAIL REPORT",
-            "17": "SUMMARY REPORT",
-            "18": "REPRINT BRIZZI TRANSAKSI TERAKHIR",
-            "19": "REPRINT BRIZZI TRANSAKSI",
-            "1A": "BRIZZI DETAIL REPORT",
-            "1B": "BRIZZI SUMMARY REPORT",
-            "1C": "QRIS DETAIL REPORT",
-            "1D": "QRIS SUMMARY REPORT",
-            "1E": "INFO KARTU BRIZZI",
-        }
-        return code_to_name_map.get(trans_code.upper(), trans_code)
+        # Codes are normally already upper case; only normalize on a miss
+        name = TRANSACTION_CODE_NAMES.get(trans_code)
+        if name is None:
+            name = TRANSACTION_CODE_NAMES.get(trans_code.upper(), trans_code)
+        return name
 
     @staticmethod
     def get_transaction_type_mapping() -> Dict[str, str]:
         """Get mapping of transaction names to codes - BRI FMS v3.3"""
-        return {
-            "SALE": "01",
-            "INSTALLMENT": "02",
-            "VOID": "03",
-            "GENERATE QR": "04",
-            "QRIS STATUS TRANSAKSI": "05",
-            "QRIS REFUND": "06",
-            "INFO SALDO BRIZZI": "07",
-            "PEMBAYARAN BRIZZI": "08",
-            "TOPUP BRIZZI TERTUNDA": "09",
-            "TOPUP BRIZZI ONLINE": "0A",
-            "UPDATE SALDO TERTUNDA BRIZZI": "0B",
-            "VOID BRIZZI": "0C",
-            "FARE NON-FARE": "0D",
-            "CONTACTLESS": "0E",
-            "SALE TIP": "0F",
-            "KEY IN": "10",
-            "LOGON": "11",
-            "SETTLEMENT": "12",
-            "SETTLEMENT BRIZZI": "13",
-            "REPRINT TRANSAKSI TERAKHIR": "14",
-            "REPRINT TRANSAKSI": "15",
-            "DETAIL REPORT": "16",
-            "SUMMARY REPORT": "17",
-            "REPRINT BRIZZI TRANSAKSI TERAKHIR": "18",
-            "REPRINT BRIZZI TRANSAKSI": "19",
-            "BRIZZI DETAIL REPORT": "1A",
-            "BRIZZI SUMMARY REPORT": "1B",
-            "QRIS DETAIL REPORT": "1C",
-            "QRIS SUMMARY REPORT": "1D",
-            "INFO KARTU BRIZZI": "1E",
-        }
+        return TRANSACTION_TYPE_CODES
 
     @staticmethod
     def parse_response_datetime(response_data: Dict[str, Any]) -> Optional[str]:
@@ -308,6 +655,16 @@ class EcrUtils:
             if not date_str or not time_str or len(date_str) != 8 or len(time_str) > 6:
                 return None
 
+            return EcrUtils._format_response_datetime(date_str, time_str)
+
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _format_response_datetime(date_str: str, time_str: str) -> Optional[str]:
+        """Format a response date (YYYYMMDD) and time (HHMMSS) as a timestamp"""
+        try:
             # Parse date: YYYYMMDD
             year = int(date_str[:4])
             month = int(date_str[4:6])
@@ -323,9 +680,19 @@ class EcrUtils:
             dt = datetime(year, month, day, hour, minute, second)
             return dt.strftime("%Y-%m-%d %H:%M:%S")
 
-        except (ValueError, TypeError):
+        except ValueError:
             return None
 
+    @staticmethod
+    def format_local_timestamp(timestamp: float) -> str:
+        """Format a Unix timestamp in local time as YYYY-MM-DD HH:MM:SS"""
+        return EcrUtils._format_local_second(int(timestamp))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _format_local_second(second: int) -> str:
+        return datetime.fromtimestamp(second).isoformat(sep=" ")
+
     @staticmethod
     def format_transaction_for_history(
         trx_id: str, transaction_data: Dict[str, Any]
@@ -336,9 +703,8 @@ class EcrUtils:
 
         # Get transaction type name
         trans_type = request_data.get("transType", "")
-        # BRI FMS v3.3 supports 0x01 to 0x1E
-        if trans_type.upper() in [f"{i:02X}" for i in range(1, 31)]:
-            trans_type = EcrUtils.get_transaction_name_from_code(trans_type)
+        # BRI FMS v3.3 supports 0x01 to 0x1E; names pass through unchanged
+        trans_type = EcrUtils.get_transaction_name_from_code(trans_type)
 
         # Get invoice number from response first, then fall back to request
         invoice_no = ""
@@ -353,9 +719,9 @@ class EcrUtils:
             trace_no = response_data["traceNo"]
 
         # Use response datetime if available, otherwise fall back to original timestamp
-        display_timestamp = time.strftime(
-            "%Y-%m-%d %H:%M:%S",
-            time.localtime(transaction_data.get("timestamp", time.time())),
+        timestamp = transaction_data.get("timestamp")
+        display_timestamp = EcrUtils.format_local_timestamp(
+            timestamp if timestamp is not None else time.time()
         )
         if response_data:
             parsed_datetime = EcrUtils.parse_response_datetime(response_data)
@@ -390,28 +756,10 @@ class EcrUtils:
     ) -> str:
         """Build human-readable request format"""
         human_readable_request = f"Transaction Type: {transaction_type}"
+        transaction_type_upper = transaction_type.upper()
 
         # Only show amount for transactions that need it
-        # Transactions that don't require amount: VOID, INFO SALDO, SETTLEMENT, REPRINT, REPORT, LOGON
-        if transaction_type.upper() not in [
-            "VOID",
-            "INFO SALDO BRIZZI",
-            "VOID BRIZZI",
-            "LOGON",
-            "SETTLEMENT",
-            "SETTLEMENT BRIZZI",
-            "REPRINT TRANSAKSI TERAKHIR",
-            "REPRINT TRANSAKSI",
-            "DETAIL REPORT",
-            "SUMMARY REPORT",
-            "REPRINT BRIZZI TRANSAKSI TERAKHIR",
-            "REPRINT BRIZZI TRANSAKSI",
-            "BRIZZI DETAIL REPORT",
-            "BRIZZI SUMMARY REPORT",
-            "QRIS DETAIL REPORT",
-            "QRIS SUMMARY REPORT",
-            "INFO KARTU BRIZZI",
-        ]:
+        if transaction_type_upper not in NO_AMOUNT_TRANSACTION_TYPES:
             # Format amount with proper display
             try:
                 amount_float = float(amount.replace(",", ""))
@@ -423,22 +771,23 @@ class EcrUtils:
                 human_readable_request += f"\nAmount: {amount}"
 
         # Add invoice/trace number/reference ID if provided
-        if invoice_no and invoice_no.strip():
-            if transaction_type.upper() in ["VOID", "VOID BRIZZI"]:
-                human_readable_request += f"\nTrace Number: {invoice_no.strip()}"
-            elif transaction_type.upper() == "QRIS STATUS TRANSAKSI":
-                human_readable_request += f"\nReference ID: {invoice_no.strip()}"
+        invoice_no = invoice_no.strip() if invoice_no else ""
+        if invoice_no:
+            if transaction_type_upper in ("VOID", "VOID BRIZZI"):
+                human_readable_request += f"\nTrace Number: {invoice_no}"
+            elif transaction_type_upper == "QRIS STATUS TRANSAKSI":
+                human_readable_request += f"\nReference ID: {invoice_no}"
             else:
-                human_readable_request += f"\nInvoice Number: {invoice_no.strip()}"
+                human_readable_request += f"\nInvoice Number: {invoice_no}"
 
         # Add additional amount (tip/non-fare) if provided for applicable transaction types
         if add_amount and add_amount != "0":
             try:
                 add_amount_float = float(add_amount.replace(",", ""))
                 if add_amount_float > 0:
-                    if transaction_type.upper() in ["SALE TIP", "GENERATE QR"]:
+                    if transaction_type_upper in ("SALE TIP", "GENERATE QR"):
                         human_readable_request += f"\nTip Amount: {add_amount_float:,.0f}"
-                    elif transaction_type.upper() == "FARE NON-FARE":
+                    elif transaction_type_upper == "FARE NON-FARE":
                         human_readable_request += f"\nNon-Fare Amount: {add_amount_float:,.0f}"
                     else:
                         human_readable_request += f"\nAdditional Amount: {add_amount_float:,.0f}"
@@ -446,37 +795,39 @@ class EcrUtils:
                 pass
 
         # Add card number if provided
-        if card_no and card_no.strip():
-            human_readable_request += f"\nCard Number: {card_no.strip()}"
+        card_no = card_no.strip() if card_no else ""
+        if card_no:
+            human_readable_request += f"\nCard Number: {card_no}"
 
         return human_readable_request
 
-    @staticmethod
-    def validate_daily_password(provided_password: str) -> bool:
+    @classmethod
+    def validate_daily_password(cls, provided_password: str) -> bool:
         """Validate password based on today's date (ddmmyyyy format)"""
-        today = datetime.now()
-        expected_password = today.strftime("%d%m%Y")
-        return provided_password == expected_password
+        expires_at, expected_password = cls._daily_password
+        if time.time() >= expires_at:
+            today = datetime.now()
+            midnight = datetime.combine(today.date() + timedelta(days=1), datetime.min.time())
+            expected_password = today.strftime("%d%m%Y").encode()
+            cls._daily_password = (midnight.timestamp(), expected_password)
+        if not isinstance(provided_password, str):
+            return False
+        return hmac.compare_digest(provided_password.encode(), expected_password)
 
-    @staticmethod
-    def generate_transaction_id() -> str:
+    @classmethod
+    def generate_transaction_id(cls) -> str:
         """Generate a unique transaction ID"""
-        import uuid
-
-        return uuid.uuid4().hex[:8].upper()
+        # next() on itertools.count is atomic, so concurrent callers never
+        # share an ID; 2**32 IDs pass before the 8 hex digits wrap around
+        return f"{next(cls._transaction_ids) & 0xFFFFFFFF:08X}"
 
     @staticmethod
     def get_entry_mode_description(entry_mode: str) -> str:
         """Get entry mode description - BRI FMS v3.3 spec"""
-        entry_mode_map = {
-            "D": "Dip (EMV Chip)",
-            "S": "Swipe (Magnetic Stripe)",
-            "F": "Fallback",
-            "M": "Manual (Key In)",
-            "T": "Tap (Contactless)",
-            "`": "QRIS MPM",  # 0x60
-        }
-        return entry_mode_map.get(entry_mode.upper(), entry_mode)
+        description = ENTRY_MODE_DESCRIPTIONS.get(entry_mode)
+        if description is None:
+            description = ENTRY_MODE_DESCRIPTIONS.get(entry_mode.upper(), entry_mode)
+        return description
 
     @staticmethod
     def check_transaction_success(response_dict: Dict[str, Any]) -> Dict[str, Any]:
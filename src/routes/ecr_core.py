@@ -5,15 +5,68 @@ Handles message packing/parsing, transaction management, and ECR library interfa
 
 import ctypes
 import binascii
+import functools
 import logging
 import os
 import platform
 import struct
 import socket
+import threading
 from typing import Dict, Optional, Any
 
 logger = logging.getLogger(__name__)
 
+STX = b"\x02"
+ETX = b"\x03"
+# Request data length in BCD: 200 decimal = 02h 00h
+REQUEST_LENGTH_BCD = b"\x02\x00"
+
+# Request frame without the trailing LRC: STX, 2-byte BCD length (200),
+# TransType, Amount, AddAmount, InvoiceNo, CardNo, Filler, ETX.
+# "s" fields are NUL-padded by struct, matching the protocol's padding.
+REQUEST_FRAME = struct.Struct("<c2sB12s12s12s19s144sc")
+REQUEST_FRAME_SIZE = REQUEST_FRAME.size + 1  # + LRC
+
+# Request data fields (200 bytes), in ReqData order
+REQUEST_FIELDS = struct.Struct("<B12s12s12s19s144s")
+
+# UI validation limits for the invoice field by transaction type:
+# (max digits, field label). Anything else is a 12-digit invoice number.
+INVOICE_LIMITS = {
+    "03": (6, "Trace number"),    # VOID - trace number
+    "0C": (6, "Trace number"),    # VOID BRIZZI - trace number
+    "06": (10, "Reference ID"),   # QRIS REFUND - reference ID
+    "05": (12, "Reference ID"),   # QRIS STATUS TRANSAKSI - reference ID
+}
+DEFAULT_INVOICE_LIMIT = (12, "Invoice number")
+
+
+class LazyHex:
+    """Hex-dump bytes only when a log record is actually formatted"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return binascii.hexlify(self.data).decode()
+
+
+# Response data fields (300 bytes), in RspData order
+RESPONSE_FIELDS = struct.Struct("<B8s15s6s25s6s6sc12s12s19s26s8s6s8s2s12s12s19s12s84s")
+
+# Characters str.strip() removes within the ASCII range
+ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
+def clean_field(byte_data: bytes) -> str:
+    """Decode and clean field by removing null bytes and whitespace"""
+    if byte_data.isascii():
+        # Strip on the bytes side so only the final value is decoded
+        return byte_data.rstrip(b"\x00").strip(ASCII_WHITESPACE).decode("ascii")
+    return byte_data.decode("ascii", errors="ignore").rstrip('\x00').strip()
+
 
 class SerialData(ctypes.Structure):
     """Serial port configuration structure matching spec appendices"""
@@ -68,115 +121,145 @@ class RspData(ctypes.Structure):
     ]
 
 
-class EcrCore:
-    """Core ECR functionality - library management and message processing"""
+# Every field is byte-sized, so the ctypes layouts have no padding and must
+# match the wire sizes and the struct formats used to fill and read them
+assert ctypes.sizeof(SerialData) == 14
+assert ctypes.sizeof(ReqData) == REQUEST_FIELDS.size == 200
+assert ctypes.sizeof(RspData) == RESPONSE_FIELDS.size == 300
 
-    def __init__(self, base_dir: str):
-        self.base_dir = base_dir
-        self.ecr_lib = None
-        self.use_library = True
-        self._init_library()
 
-    def _init_library(self):
-        """Initialize the native ECR library"""
-        # Allow disabling native library via environment variable
-        if os.environ.get("DISABLE_NATIVE_LIBRARY", "").lower() == "true":
-            self.use_library = False
-            logger.info("Native library disabled via environment variable")
-            return
+def bind_library_functions(ecr_lib) -> None:
+    """Declare ctypes signatures on a freshly loaded ECR library handle"""
+    # Version functions
+    ecr_lib.ecrGetVersion.argtypes = [ctypes.c_char_p]
+    ecr_lib.ecrGetVersion.restype = None
 
-        lib_name = (
-            "BriEcrLibrary.dll"
-            if platform.system() == "Windows"
-            else "libBriEcrLibrary.so"
-        )
+    # Socket functions (matching desktop version)
+    ecr_lib.ecrOpenSocket.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]
+    ecr_lib.ecrOpenSocket.restype = ctypes.c_int
 
-        try:
-            # Try multiple paths for library loading
-            search_paths = [
-                os.path.join(self.base_dir, lib_name),
-                os.path.join(os.path.dirname(self.base_dir), lib_name),
-                lib_name,  # Try system PATH
-            ]
-
-            lib_path = None
-            for path in search_paths:
-                if os.path.exists(path):
-                    lib_path = path
-                    break
+    ecr_lib.ecrSendSocket.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    ecr_lib.ecrSendSocket.restype = ctypes.c_int
 
-            if lib_path:
-                self.ecr_lib = ctypes.CDLL(lib_path)
-                logger.info(f"Loaded {lib_name} successfully from {lib_path}")
-                self._setup_library_functions()
+    ecr_lib.ecrRecvSocket.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    ecr_lib.ecrRecvSocket.restype = ctypes.c_int
 
-                # Test version call
-                version_buf = ctypes.create_string_buffer(20)
-                self.ecr_lib.ecrGetVersion(version_buf)
-                logger.info(f"Library version: {version_buf.value.decode('ascii')}")
-            else:
-                raise FileNotFoundError(f"Could not find {lib_name}")
+    ecr_lib.ecrCloseSocket.argtypes = []
+    ecr_lib.ecrCloseSocket.restype = None
 
-        except Exception as e:
-            logger.error(
-                f"Failed to load {lib_name}: {e}. Falling back to native Python."
-            )
-            self.ecr_lib = None
+    # Serial port functions
+    ecr_lib.ecrOpenSerialPort.argtypes = [ctypes.POINTER(SerialData)]
+    ecr_lib.ecrOpenSerialPort.restype = ctypes.c_int
 
-    def _setup_library_functions(self):
-        """Set up function signatures for the native library"""
-        if not self.ecr_lib:
-            return
+    ecr_lib.ecrSendSerialPort.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+    ecr_lib.ecrSendSerialPort.restype = ctypes.c_int
 
-        # Version functions
-        self.ecr_lib.ecrGetVersion.argtypes = [ctypes.c_char_p]
-        self.ecr_lib.ecrGetVersion.restype = None
+    ecr_lib.ecrRecvSerialPort.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+    ecr_lib.ecrRecvSerialPort.restype = ctypes.c_int
 
-        # Socket functions (matching desktop version)
-        self.ecr_lib.ecrOpenSocket.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]
-        self.ecr_lib.ecrOpenSocket.restype = ctypes.c_int
+    ecr_lib.ecrCloseSerialPort.argtypes = []
+    ecr_lib.ecrCloseSerialPort.restype = None
 
-        self.ecr_lib.ecrSendSocket.argtypes = [ctypes.c_void_p, ctypes.c_int]
-        self.ecr_lib.ecrSendSocket.restype = ctypes.c_int
+    # Message processing functions
+    ecr_lib.ecrPackRequest.argtypes = [
+        ctypes.c_void_p,
+        ctypes.POINTER(ReqData),
+    ]
+    ecr_lib.ecrPackRequest.restype = ctypes.c_int
 
-        self.ecr_lib.ecrRecvSocket.argtypes = [ctypes.c_void_p, ctypes.c_int]
-        self.ecr_lib.ecrRecvSocket.restype = ctypes.c_int
+    ecr_lib.ecrParseResponse.argtypes = [
+        ctypes.c_void_p,
+        ctypes.POINTER(RspData),
+    ]
+    ecr_lib.ecrParseResponse.restype = ctypes.c_int
+
+
+@functools.lru_cache(maxsize=None)
+def load_ecr_library(base_dir: str):
+    """Locate, load and bind the native ECR library once per base directory
+
+    Returns the bound CDLL handle, or None when the library is unavailable.
+    """
+    lib_name = (
+        "BriEcrLibrary.dll"
+        if platform.system() == "Windows"
+        else "libBriEcrLibrary.so"
+    )
+
+    try:
+        # Try multiple paths for library loading
+        search_paths = [
+            os.path.join(base_dir, lib_name),
+            os.path.join(os.path.dirname(base_dir), lib_name),
+            lib_name,  # Try system PATH
+        ]
 
-        self.ecr_lib.ecrCloseSocket.argtypes = []
-        self.ecr_lib.ecrCloseSocket.restype = None
+        # ECR_LIBRARY_PATH pins the library explicitly and skips the search;
+        # check_library.py honours the same variable
+        lib_path = os.environ.get("ECR_LIBRARY_PATH", "") or None
+        if lib_path is None:
+            for path in search_paths:
+                if os.path.exists(path):
+                    lib_path = path
+                    break
 
-        # Serial port functions
-        self.ecr_lib.ecrOpenSerialPort.argtypes = [ctypes.POINTER(SerialData)]
-        self.ecr_lib.ecrOpenSerialPort.restype = ctypes.c_int
+        if not lib_path:
+            raise FileNotFoundError(f"Could not find {lib_name}")
 
-        self.ecr_lib.ecrSendSerialPort.argtypes = [ctypes.c_void_p, ctypes.c_uint]
-        self.ecr_lib.ecrSendSerialPort.restype = ctypes.c_int
+        ecr_lib = ctypes.CDLL(lib_path)
+        logger.info(f"Loaded {lib_name} successfully from {lib_path}")
+        bind_library_functions(ecr_lib)
 
-        self.ecr_lib.ecrRecvSerialPort.argtypes = [ctypes.c_void_p, ctypes.c_uint]
-        self.ecr_lib.ecrRecvSerialPort.restype = ctypes.c_int
+        # Test version call
+        version_buf = ctypes.create_string_buffer(20)
+        ecr_lib.ecrGetVersion(version_buf)
+        logger.info(f"Library version: {version_buf.value.decode('ascii')}")
+        return ecr_lib
 
-        self.ecr_lib.ecrCloseSerialPort.argtypes = []
-        self.ecr_lib.ecrCloseSerialPort.restype = None
+    except Exception as e:
+        logger.error(
+            f"Failed to load {lib_name}: {e}. Falling back to native Python."
+        )
+        return None
 
-        # Message processing functions
-        self.ecr_lib.ecrPackRequest.argtypes = [
-            ctypes.c_void_p,
-            ctypes.POINTER(ReqData),
-        ]
-        self.ecr_lib.ecrPackRequest.restype = ctypes.c_int
 
-        self.ecr_lib.ecrParseResponse.argtypes = [
-            ctypes.c_void_p,
-            ctypes.POINTER(RspData),
-        ]
-        self.ecr_lib.ecrParseResponse.restype = ctypes.c_int
+class EcrCore:
+    """Core ECR functionality - library management and message processing"""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self.ecr_lib = None
+        self.use_library = True
+        self.python_socket = None  # Pure Python fallback connection
+        # Receive buffers are reused per thread: the listener thread and the
+        # transaction thread can both poll the socket at the same time
+        self._recv_local = threading.local()
+        self._init_library()
+
+    def _init_library(self):
+        """Initialize the native ECR library"""
+        # Allow disabling native library via environment variable
+        if os.environ.get("DISABLE_NATIVE_LIBRARY", "").lower() == "true":
+            self.use_library = False
+            logger.info("Native library disabled via environment variable")
+            return
+
+        self.ecr_lib = load_ecr_library(self.base_dir)
 
     def calculate_lrc(self, data: bytes) -> int:
         """Calculate LRC (Longitudinal Redundancy Check)"""
-        lrc = 0
-        for byte in data:
-            lrc ^= byte
-        logger.debug(f"LRC calculated: {lrc:02X}")
+        # XOR all bytes by folding the frame as one big integer: each step
+        # XORs the upper half onto the lower half, so a 205-byte frame takes
+        # 8 steps instead of 205 interpreter iterations
+        width = len(data)
+        lrc = int.from_bytes(data, "little")
+        while width > 1:
+            half = (width + 1) >> 1
+            bits = half << 3
+            lrc = (lrc ^ (lrc >> bits)) & ((1 << bits) - 1)
+            width = half
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LRC calculated: %02X", lrc)
         return lrc
 
     def format_amount(self, amount_str: str) -> str:
@@ -185,12 +268,13 @@ class EcrCore:
             if not amount_str or not amount_str.strip():
                 return ""
             amount_int = int(amount_str)
-            # Divide by 100 to reverse the multiplication done during sending
-            formatted_amount = amount_int / 100
-            if formatted_amount == int(formatted_amount):
-                return str(int(formatted_amount))
-            else:
-                return f"{formatted_amount:.2f}"
+            # Divide by 100 to reverse the multiplication done during sending;
+            # integer division keeps currency values exact
+            whole, cents = divmod(abs(amount_int), 100)
+            sign = "-" if amount_int < 0 else ""
+            if cents:
+                return f"{sign}{whole}.{cents:02d}"
+            return f"{sign}{whole}"
         except (ValueError, TypeError):
             return amount_str
 
@@ -240,6 +324,10 @@ class EcrCore:
             try:
                 import socket as sock
                 self.python_socket = sock.socket(sock.AF_INET, sock.SOCK_STREAM)
+                # ECR frames are small request/response pairs: don't let
+                # Nagle hold them back, and detect dead EDC links
+                self.python_socket.setsockopt(sock.IPPROTO_TCP, sock.TCP_NODELAY, 1)
+                self.python_socket.setsockopt(sock.SOL_SOCKET, sock.SO_KEEPALIVE, 1)
                 self.python_socket.settimeout(60)
                 self.python_socket.connect((ip, port))
                 logger.info(f"Socket opened via Python: {ip}:{port}")
@@ -263,11 +351,11 @@ class EcrCore:
                 return False
         else:
             # Fallback: Pure Python socket send
-            if hasattr(self, 'python_socket') and self.python_socket:
+            if self.python_socket is not None:
                 try:
                     self.python_socket.sendall(data)
                     logger.info(f"Socket data sent via Python: {len(data)} bytes")
-                    logger.debug(f"Sent data (hex): {binascii.hexlify(data).decode()}")
+                    logger.debug("Sent data (hex): %s", LazyHex(data))
                     return True
                 except Exception as e:
                     logger.error(f"Python socket send error: {e}")
@@ -276,6 +364,14 @@ class EcrCore:
                 logger.error("No socket connection available")
                 return False
 
+    def _recv_buffer(self, size: int):
+        """Return this thread's receive buffer, growing it when needed"""
+        buffer = getattr(self._recv_local, "buffer", None)
+        if buffer is None or len(buffer) < size:
+            buffer = ctypes.create_string_buffer(size)
+            self._recv_local.buffer = buffer
+        return buffer
+
     def recv_socket(self, size: int = 9999, timeout: float = 10.0) -> bytes:
         """Receive data from socket - matching desktop BriEcrLibrary.recvSocket
 
@@ -285,12 +381,12 @@ class EcrCore:
         """
         if self.ecr_lib and self.use_library:
             try:
-                buffer = ctypes.create_string_buffer(size)
+                buffer = self._recv_buffer(size)
                 ret = self.ecr_lib.ecrRecvSocket(buffer, size)
                 if ret > 0:
-                    data = buffer.raw[:ret]
+                    data = ctypes.string_at(buffer, ret)
                     logger.info(f"✓ Socket data received via library: {ret} bytes")
-                    logger.debug(f"Received hex: {binascii.hexlify(data).decode()}")
+                    logger.debug("Received hex: %s", LazyHex(data))
                     return data
                 elif ret == 0:
                     # No data - this is normal during polling
@@ -309,14 +405,18 @@ class EcrCore:
                 return b""
         else:
             # Fallback: Pure Python socket receive
-            if hasattr(self, 'python_socket') and self.python_socket:
+            if self.python_socket is not None:
                 try:
-                    # Use configurable timeout (default 10s for normal receive, lower for flushing)
-                    self.python_socket.settimeout(timeout)
-                    data = self.python_socket.recv(size)
+                    # Use configurable timeout (default 10s for normal receive, lower for flushing);
+                    # settimeout costs fcntl syscalls, so only change it when it differs
+                    if self.python_socket.gettimeout() != timeout:
+                        self.python_socket.settimeout(timeout)
+                    buffer = self._recv_buffer(size)
+                    received = self.python_socket.recv_into(buffer, size)
+                    data = ctypes.string_at(buffer, received)
                     if len(data) > 0:
                         logger.info(f"✓ Socket data received via Python: {len(data)} bytes")
-                        logger.debug(f"Received data (hex): {binascii.hexlify(data).decode()}")
+                        logger.debug("Received data (hex): %s", LazyHex(data))
                     else:
                         logger.debug("No data received (empty response)")
                     return data
@@ -340,7 +440,7 @@ class EcrCore:
                 logger.error(f"Socket close error: {e}")
         else:
             # Fallback: Pure Python socket close
-            if hasattr(self, 'python_socket') and self.python_socket:
+            if self.python_socket is not None:
                 try:
                     self.python_socket.close()
                     self.python_socket = None
@@ -384,7 +484,7 @@ class EcrCore:
 
     def parse_response_message(self, response_bytes: bytes) -> Dict[str, str]:
         """Parse message response message from ECR device"""
-        logger.info(f"Parsing response: {binascii.hexlify(response_bytes).decode()}")
+        logger.info("Parsing response: %s", LazyHex(response_bytes))
 
         # Try native library first
         if self.ecr_lib and self.use_library:
@@ -411,18 +511,27 @@ class EcrCore:
         self, amount: str, trans_type: str, use_serial_multiplier: bool
     ) -> str:
         """Format amount string matching desktop: %010d00 format (10 digits + '00')"""
+        # BRI FMS v3.3: Desktop uses format "%010d00" which is 10 digits + "00" appended
+        # This effectively sends amount in cents (multiply by 100)
+        # Example: amount=10 -> "000000001000" (10*100)
+        digits = amount.replace(",", "")
+        if digits.isascii() and digits.isdigit():
+            # Plain digit strings are padded directly, without an int round-trip
+            significant = digits.lstrip("0")
+            if len(significant) <= 10:
+                amount_str = significant.zfill(10) + "00"
+                logger.debug("Amount conversion: original='%s' -> formatted='%s'", amount, amount_str)
+                return amount_str
+
+        # Anything else (signs, surrounding whitespace, too many digits) goes
+        # through int() so it is accepted or rejected exactly as before
         try:
-            amount_int = int(amount.replace(",", ""))
+            amount_int = int(digits)
             if amount_int < 0:
                 raise ValueError("Amount must be non-negative")
 
-            # BRI FMS v3.3: Desktop uses format "%010d00" which is 10 digits + "00" appended
-            # This effectively sends amount in cents (multiply by 100)
-            # Example: amount=10 -> "000000001000" (10*100)
             amount_str = f"{amount_int:010d}00"
-            logger.info(
-                f"Amount conversion: original='{amount}' -> int={amount_int} -> formatted='{amount_str}' (desktop format %010d00)"
-            )
+            logger.debug("Amount conversion: original='%s' -> formatted='%s'", amount, amount_str)
 
             if not amount_str.isdigit() or len(amount_str) != 12:
                 raise ValueError("Amount must be numeric and 12 bytes")
@@ -443,61 +552,44 @@ class EcrCore:
             raise ValueError("Invoice number must be numeric")
 
         # Validate max length based on transaction type (UI validation)
-        # VOID (0x03), VOID BRIZZI (0x0C) - trace number max 6 digits
-        if trans_type in ["03", "0C"]:
-            if len(invoice_str) > 6:
-                logger.error(f"Trace number too long: {invoice_no} (max 6 digits)")
-                raise ValueError("Trace number must be 6 digits or less")
-            logger.info(f"VOID trace number: {invoice_no} (max 6 digits)")
-        # QRIS REFUND (0x06) - reference ID max 10 digits
-        elif trans_type == "06":
-            if len(invoice_str) > 10:
-                logger.error(f"Reference ID too long: {invoice_no} (max 10 digits)")
-                raise ValueError("Reference ID must be 10 digits or less")
-            logger.info(f"QRIS Refund reference ID: {invoice_no} (max 10 digits)")
-        # QRIS STATUS TRANSAKSI (0x05) - reference ID max 12 digits
-        elif trans_type == "05":
-            if len(invoice_str) > 12:
-                logger.error(f"Reference ID too long: {invoice_no} (max 12 digits)")
-                raise ValueError("Reference ID must be 12 digits or less")
-            logger.info(f"QRIS Status reference ID: {invoice_no} (max 12 digits)")
-        # All other transactions - standard 12 digit max
-        else:
-            if len(invoice_str) > 12:
-                logger.error(f"Invoice_no too long: {invoice_no} (max 12 digits)")
-                raise ValueError("Invoice number must be 12 digits or less")
+        max_len, label = INVOICE_LIMITS.get(trans_type, DEFAULT_INVOICE_LIMIT)
+        if len(invoice_str) > max_len:
+            logger.error("%s too long: %s (max %d digits)", label, invoice_no, max_len)
+            raise ValueError(f"{label} must be {max_len} digits or less")
 
         # ALWAYS pad to 12 bytes for wire format (matches desktop %012d)
         invoice_str = invoice_str.zfill(12)
-        logger.info(f"Invoice formatted to 12 bytes: {invoice_no} -> {invoice_str}")
+        logger.debug("Invoice formatted to 12 bytes: %s -> %s", invoice_no, invoice_str)
 
         return invoice_str
 
     def _validate_card_number(self, card_no: str) -> str:
         """Validate and format card number"""
-        if card_no and not all(c.isalnum() or c == " " for c in card_no):
+        # Letters, digits and spaces only; str.isalnum scans the whole string in C
+        unspaced = card_no.replace(" ", "") if card_no else ""
+        if unspaced and not unspaced.isalnum():
             logger.error(f"Invalid card_no format: {card_no}")
             raise ValueError("Card number must be alphanumeric")
-        return card_no
+        # A missing card number (e.g. "cardNo": null) packs as a zero-filled field
+        return card_no or ""
 
     def _pack_with_library(
         self, trans_type_int: int, amount_str: str, add_amount_str: str, invoice_str: str, card_no_str: str
     ) -> bytes:
         """Pack message using native library - BRI FMS v3.3 format"""
+        # Fill ReqData in one call instead of one ctypes field write each;
+        # card number (BRIZZI) and filler (bank use) are NUL-padded
         req = ReqData()
-        req.chTransType = trans_type_int
-        req.szAmount = amount_str.encode("ascii")  # 12 bytes
-        req.szAddAmount = add_amount_str.encode("ascii")  # 12 bytes - Tip/Non-Fare Amount
-        req.szInvNo = invoice_str.encode("ascii")  # 12 bytes - Invoice/Reff No
-
-        # Card number for BRIZZI transactions (19 bytes)
-        if card_no_str:
-            req.szCardNo = card_no_str.ljust(19, '\x00').encode("ascii")[:19]
-        else:
-            req.szCardNo = b"\x00" * 19
-
-        # Filler (144 bytes) - for bank use
-        req.szFiller = b"\x00" * 144
+        REQUEST_FIELDS.pack_into(
+            req,
+            0,
+            trans_type_int,
+            amount_str.encode("ascii"),  # 12 bytes
+            add_amount_str.encode("ascii"),  # 12 bytes - Tip/Non-Fare Amount
+            invoice_str.encode("ascii"),  # 12 bytes - Invoice/Reff No
+            card_no_str.encode("ascii"),  # 19 bytes
+            b"",  # 144 bytes
+        )
 
         req_msg_buf = ctypes.create_string_buffer(205)
         ret = self.ecr_lib.ecrPackRequest(req_msg_buf, ctypes.byref(req))
@@ -506,7 +598,7 @@ class EcrCore:
 
         packed = req_msg_buf.raw[:ret]
 
-        logger.info(f"Packed message with library: {binascii.hexlify(packed).decode()}")
+        logger.info("Packed message with library: %s", LazyHex(packed))
         return packed
 
     def _pack_manual(
@@ -514,40 +606,28 @@ class EcrCore:
     ) -> bytes:
         """Manual message packing fallback - BRI FMS v3.3 format"""
         # Structure: [TransType:1][Amount:12][AddAmount:12][InvoiceNo:12][CardNo:19][Filler:144] = 200 bytes
-        chTransType = trans_type_int
-        szAmount = amount_str.encode("ascii")  # 12 bytes
-        szAddAmount = add_amount_str.encode("ascii")  # 12 bytes - Tip/Non-Fare Amount
-        szInvNo = invoice_str.encode("ascii")  # 12 bytes
-
-        # Card number for BRIZZI transactions (19 bytes)
-        if card_no_str:
-            szCardNo = card_no_str.ljust(19, '\x00').encode("ascii")[:19]
-        else:
-            szCardNo = b"\x00" * 19
-
-        # Filler (144 bytes) - for bank use
-        szFiller = b"\x00" * 144
-
-        # Build the message data
-        message_data = bytes([chTransType]) + szAmount + szAddAmount + szInvNo + szCardNo + szFiller
-        assert len(message_data) == 200, f"Invalid data length: {len(message_data)}, expected 200"
-
-        stx = b"\x02"
-        # Length in BCD format (as per protocol spec): 200 decimal = 02h 00h in BCD
-        # BCD format: each byte represents two decimal digits
-        # For 200: high byte = 02h (hundreds), low byte = 00h (tens and ones)
-        length_bcd = bytes([0x02, 0x00])  # 200 in BCD format
-        etx = b"\x03"
+        # Card number (BRIZZI) and filler are NUL-padded by the struct format
+        buf = bytearray(REQUEST_FRAME_SIZE)
+        REQUEST_FRAME.pack_into(
+            buf,
+            0,
+            STX,
+            REQUEST_LENGTH_BCD,
+            trans_type_int,
+            amount_str.encode("ascii"),
+            add_amount_str.encode("ascii"),
+            invoice_str.encode("ascii"),
+            card_no_str.encode("ascii"),
+            b"",
+            ETX,
+        )
         # LRC calculation: Desktop includes STX despite documentation saying otherwise
         # Verified: Desktop sends LRC=0x12 (includes STX), not 0x10 (excludes STX)
         # Must match desktop for compatibility with EDC device
-        to_lrc = stx + length_bcd + message_data + etx
-        lrc_value = self.calculate_lrc(to_lrc)
-        lrc = bytes([lrc_value])
+        buf[-1] = self.calculate_lrc(memoryview(buf)[:-1])
+        packed = bytes(buf)
 
-        packed = stx + length_bcd + message_data + etx + lrc
-
-        logger.info(f"Final packed message: {binascii.hexlify(packed).decode()}")
+        logger.info("Final packed message: %s", LazyHex(packed))
         return packed
     
 
@@ -559,49 +639,74 @@ class EcrCore:
         if ret != 0:
             raise ValueError(f"Parse failed: {ret}")
 
-        # BRI FMS v3.3 response format (300 bytes)
+        # BRI FMS v3.3 response format (300 bytes): unpack the whole
+        # structure at once instead of going through each ctypes field
+        return self._build_response(RESPONSE_FIELDS.unpack(bytes(rsp)))
+
+    def _build_response(self, fields: tuple) -> Dict[str, str]:
+        """Build the response dict from RESPONSE_FIELDS.unpack() output"""
+        (
+            chTransType, szTID, szMID, szBatchNumber, szIssuerName, szTraceNo,
+            szInvoiceNo, chEntryMode, szTransAmount, szTotalAmount, szCardNo,
+            szCardholderName, szDate, szTime, szApprovalCode, szResponseCode,
+            szRefNumber, szBalancePrepaid, szTopupCardNo, szTransAddAmount, szFiller,
+        ) = fields
+
+        trans_amount_raw = clean_field(szTransAmount)
+        total_amount_raw = clean_field(szTotalAmount)
+        date_raw = clean_field(szDate)
+        time_raw = clean_field(szTime)
+        balance_prepaid_raw = clean_field(szBalancePrepaid)
+        trans_add_amount_raw = clean_field(szTransAddAmount)
+        filler_content = clean_field(szFiller)
+
+        # Filler holds a status message, or QR data when it starts with "00"
+        if filler_content and not filler_content.startswith("00"):
+            message = filler_content
+            qr_code = ""
+        else:
+            message = ""
+            qr_code = filler_content
+
         return {
-            "transType": f"{rsp.chTransType:02X}",
-            "tid": rsp.szTID.value.decode("ascii", errors="ignore").strip(),
-            "mid": rsp.szMID.value.decode("ascii", errors="ignore").strip(),
-            "batchNumber": rsp.szBatchNumber.value.decode("ascii", errors="ignore").strip(),
-            "issuerName": rsp.szIssuerName.value.decode("ascii", errors="ignore").strip(),
-            "traceNo": rsp.szTraceNo.value.decode("ascii", errors="ignore").strip(),
-            "invoiceNo": rsp.szInvoiceNo.value.decode("ascii", errors="ignore").strip(),
-            "entryMode": chr(rsp.chEntryMode) if rsp.chEntryMode else "",
-            "transAmount": self.format_amount(
-                rsp.szTransAmount.value.decode("ascii", errors="ignore").strip()
+            "transType": f"{chTransType:02X}",
+            "tid": clean_field(szTID),
+            "mid": clean_field(szMID),
+            "batchNumber": clean_field(szBatchNumber),
+            "issuerName": clean_field(szIssuerName),
+            "traceNo": clean_field(szTraceNo),
+            "invoiceNo": clean_field(szInvoiceNo),
+            "entryMode": clean_field(chEntryMode),
+            "transAmount": (
+                self.format_amount(trans_amount_raw) if trans_amount_raw else ""
             ),
-            "totalAmount": self.format_amount(
-                rsp.szTotalAmount.value.decode("ascii", errors="ignore").strip()
+            "totalAmount": (
+                self.format_amount(total_amount_raw) if total_amount_raw else ""
             ),
-            "cardNo": rsp.szCardNo.value.decode("ascii", errors="ignore").strip(),
-            "cardholderName": rsp.szCardholderName.value.decode("ascii", errors="ignore").strip(),
-            "date": self.format_date(rsp.szDate.value.decode("ascii", errors="ignore").strip()),
-            "time": self.format_time(rsp.szTime.value.decode("ascii", errors="ignore").strip()),
-            "approvalCode": rsp.szApprovalCode.value.decode("ascii", errors="ignore").strip(),
-            "responseCode": rsp.szResponseCode.value.decode("ascii", errors="ignore").strip(),
-            "refNumber": rsp.szRefNumber.value.decode("ascii", errors="ignore").strip(),
-            "balancePrepaid": self.format_amount(
-                rsp.szBalancePrepaid.value.decode("ascii", errors="ignore").strip()
+            "cardNo": clean_field(szCardNo),
+            "cardholderName": clean_field(szCardholderName),
+            "date": self.format_date(date_raw) if date_raw else "",
+            "time": self.format_time(time_raw) if time_raw else "",
+            "approvalCode": clean_field(szApprovalCode),
+            "responseCode": clean_field(szResponseCode),
+            "refNumber": clean_field(szRefNumber),
+            "balancePrepaid": (
+                self.format_amount(balance_prepaid_raw) if balance_prepaid_raw else ""
             ),
-            "topupCardNo": rsp.szTopupCardNo.value.decode("ascii", errors="ignore").strip(),
-            "transAddAmount": self.format_amount(
-                rsp.szTransAddAmount.value.decode("ascii", errors="ignore").strip()
+            "topupCardNo": clean_field(szTopupCardNo),
+            "transAddAmount": (
+                self.format_amount(trans_add_amount_raw) if trans_add_amount_raw else ""
             ),
-            "filler": rsp.szFiller.value.decode("ascii", errors="ignore").strip(),
-            "qrCode": "",  # QR code data comes separately in serial communication
+            "filler": message,
+            "qrCode": qr_code,
         }
 
     def _parse_manual(self, response_bytes: bytes) -> Dict[str, str]:
         """Manual response parsing fallback - BRI FMS v3.3 (300 bytes)"""
-
-        def clean_field(byte_data: bytes) -> str:
-            """Decode and clean field by removing null bytes and whitespace"""
-            return byte_data.decode("ascii", errors="ignore").rstrip('\x00').strip()
-
         logger.info(f"Starting manual response parsing, received {len(response_bytes)} bytes")
-        logger.debug(f"Response bytes (first 50): {response_bytes[:50].hex()}")
+        # Sub-ranges of the frame are taken as views, not copies
+        view = memoryview(response_bytes)
+        logger.debug("Response bytes (first 50): %s", LazyHex(view[:50]))
 
         # Validate message structure
         if len(response_bytes) < 5:
@@ -611,8 +716,8 @@ class EcrCore:
             logger.error(f"Missing STX, found: 0x{response_bytes[0]:02X}")
             raise ValueError("Missing STX")
 
-        length_bytes = response_bytes[1:3]
-        msg_len = length_bytes[0] * 100 + length_bytes[1]
+        # Length header: hundreds in the first byte, remainder in the second
+        msg_len = response_bytes[1] * 100 + response_bytes[2]
         logger.info(f"Message length from header: {msg_len} bytes (expected 300)")
         if msg_len != 300:
             logger.error(f"Invalid message length: {msg_len}, expected 300")
@@ -632,7 +737,6 @@ class EcrCore:
 
         data_start = 3
         data_end = data_start + msg_len
-        data = response_bytes[data_start:data_end]
         logger.debug(f"Extracting data from position {data_start} to {data_end} ({msg_len} bytes)")
 
         # Check for ETX - be flexible about its position for responses with QR data
@@ -643,129 +747,19 @@ class EcrCore:
             logger.debug(f"ETX found at position {data_end}")
             # Only validate LRC if we have proper ETX
             received_lrc = response_bytes[data_end + 1] if (data_end + 1) < len(response_bytes) else 0x00
-            # LRC calculation: Include STX (matching desktop behavior, not documentation)
-            stx_byte = bytes([response_bytes[0]])  # STX = 0x02
-            to_lrc = stx_byte + length_bytes + data + bytes([etx])
-            computed_lrc = self.calculate_lrc(to_lrc)
-            logger.debug(f"LRC check: received=0x{received_lrc:02X}, computed=0x{computed_lrc:02X}")
-            if received_lrc != computed_lrc:
+            # LRC calculation: Include STX (matching desktop behavior, not documentation).
+            # XOR over STX..ETX plus the received LRC is 0 exactly when the LRC
+            # matches, so one pass over the frame in place validates it
+            residue = self.calculate_lrc(view[:data_end + 2])
+            if residue or logger.isEnabledFor(logging.DEBUG):
+                computed_lrc = residue ^ received_lrc
+                logger.debug(f"LRC check: received=0x{received_lrc:02X}, computed=0x{computed_lrc:02X}")
+            if residue:
                 logger.warning(
                     f"LRC mismatch: received {received_lrc:02X}, computed {computed_lrc:02X}"
                 )
 
         logger.info("✓ Response validation successful, unpacking data fields...")
 
-        # Unpack data fields according to BRI FMS v3.3 spec (300 bytes)
-        offset = 0
-        chTransType = data[offset]
-        offset += 1
-        szTID = data[offset : offset + 8]
-        offset += 8
-        szMID = data[offset : offset + 15]
-        offset += 15
-        szBatchNumber = data[offset : offset + 6]
-        offset += 6
-        szIssuerName = data[offset : offset + 25]
-        offset += 25
-        szTraceNo = data[offset : offset + 6]
-        offset += 6
-        szInvoiceNo = data[offset : offset + 6]
-        offset += 6
-        chEntryMode = data[offset : offset + 1]
-        offset += 1
-        szTransAmount = data[offset : offset + 12]
-        offset += 12
-        szTotalAmount = data[offset : offset + 12]
-        offset += 12
-        szCardNo = data[offset : offset + 19]
-        offset += 19
-        szCardholderName = data[offset : offset + 26]
-        offset += 26
-        szDate = data[offset : offset + 8]
-        offset += 8
-        szTime = data[offset : offset + 6]
-        offset += 6
-        szApprovalCode = data[offset : offset + 8]
-        offset += 8
-        szResponseCode = data[offset : offset + 2]
-        offset += 2
-        szRefNumber = data[offset : offset + 12]
-        offset += 12
-        szBalancePrepaid = data[offset : offset + 12]
-        offset += 12
-        szTopupCardNo = data[offset : offset + 19]
-        offset += 19
-        szTransAddAmount = data[offset : offset + 12]
-        offset += 12
-        szFiller = data[offset : offset + 84]
-
-        # Extract and decode fields using clean_field to remove null bytes
-        trans_type = f"{chTransType:02X}"
-        tid = clean_field(szTID)
-        mid = clean_field(szMID)
-        batch_number = clean_field(szBatchNumber)
-        issuer_name = clean_field(szIssuerName)
-        trace_no = clean_field(szTraceNo)
-        invoice_no = clean_field(szInvoiceNo)
-        entry_mode = clean_field(chEntryMode)
-        trans_amount_raw = clean_field(szTransAmount)
-        total_amount_raw = clean_field(szTotalAmount)
-        card_no = clean_field(szCardNo)
-        cardholder_name = clean_field(szCardholderName)
-        date_raw = clean_field(szDate)
-        time_raw = clean_field(szTime)
-        approval_code = clean_field(szApprovalCode)
-        response_code = clean_field(szResponseCode)
-        ref_number = clean_field(szRefNumber)
-        balance_prepaid_raw = clean_field(szBalancePrepaid)
-        topup_card_no = clean_field(szTopupCardNo)
-        trans_add_amount_raw = clean_field(szTransAddAmount)
-        filler_content = clean_field(szFiller)
-
-        # Separate message from QR code in filler field
-        # For non-QR transactions, filler contains status message
-        # For QR transactions, filler may contain QR data or message
-        if filler_content and not filler_content.startswith("00"):
-            # If filler doesn't start with "00", it's probably a status message
-            message = filler_content
-            qr_code = ""
-        else:
-            # If filler starts with "00", it might be QR data
-            message = ""
-            qr_code = filler_content
-
-        # Always include all fields, even if empty, for consistent JSON structure
-        result = {
-            "transType": trans_type,
-            "tid": tid,
-            "mid": mid,
-            "batchNumber": batch_number,
-            "issuerName": issuer_name,
-            "traceNo": trace_no,
-            "invoiceNo": invoice_no,
-            "entryMode": entry_mode,
-            "transAmount": (
-                self.format_amount(trans_amount_raw) if trans_amount_raw else ""
-            ),
-            "totalAmount": (
-                self.format_amount(total_amount_raw) if total_amount_raw else ""
-            ),
-            "cardNo": card_no,
-            "cardholderName": cardholder_name,
-            "date": self.format_date(date_raw) if date_raw else "",
-            "time": self.format_time(time_raw) if time_raw else "",
-            "approvalCode": approval_code,
-            "responseCode": response_code,
-            "refNumber": ref_number,
-            "balancePrepaid": (
-                self.format_amount(balance_prepaid_raw) if balance_prepaid_raw else ""
-            ),
-            "topupCardNo": topup_card_no,
-            "transAddAmount": (
-                self.format_amount(trans_add_amount_raw) if trans_add_amount_raw else ""
-            ),
-            "filler": message,
-            "qrCode": qr_code,
-        }
-
-        return result
+        # Unpack data fields according to BRI FMS v3.3 spec (300 bytes) in one call
+        return self._build_response(RESPONSE_FIELDS.unpack_from(response_bytes, data_start))
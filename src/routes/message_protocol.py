@@ -5,6 +5,7 @@ Handles message formatting, transaction processing, and protocol-specific logic
 
 import time
 import logging
+import threading
 from typing import Dict, Any, Optional, Callable
 from .ecr_core import EcrCore
 from .serial_comm import SerialComm
@@ -13,6 +14,11 @@ from .ecr_config import EcrConfig, EcrUtils
 
 logger = logging.getLogger(__name__)
 
+# Field names for ConnectionManager's status snapshot tuple
+STATUS_FIELDS = ("connected", "network_available", "auto_disconnect_on_offline")
+# Minimum seconds between background network checks in socket mode
+NETWORK_CHECK_INTERVAL = 5.0
+
 
 class TransactionProcessor:
     """Main transaction processing coordinator"""
@@ -110,10 +116,7 @@ class TransactionProcessor:
             # Update transaction with error
             self.config.update_transaction(trx_id, {"status": "error", "error": str(e)})
 
-            local_timestamp = time.strftime(
-                "%Y-%m-%d %H:%M:%S",
-                time.localtime(transaction_data["timestamp"]),
-            )
+            local_timestamp = EcrUtils.format_local_timestamp(transaction_data["timestamp"])
 
             raise ValueError(str(e))
 
@@ -177,9 +180,8 @@ class TransactionProcessor:
                 success_check = EcrUtils.check_transaction_success(response_dict)
 
                 # Parse timestamp
-                local_timestamp = time.strftime(
-                    "%Y-%m-%d %H:%M:%S",
-                    time.localtime(self.config.get_transaction(trx_id)["timestamp"]),
+                local_timestamp = EcrUtils.format_local_timestamp(
+                    self.config.get_transaction(trx_id)["timestamp"]
                 )
                 parsed_timestamp = EcrUtils.parse_response_datetime(response_dict)
                 timestamp = parsed_timestamp if parsed_timestamp else local_timestamp
@@ -234,24 +236,10 @@ class TransactionProcessor:
                 response_type == "RESPONSE" or response_type == "RAW_RESPONSE"
             ) and response_data:
                 logger.info("Processing valid response data")
-                # Find the latest processing transaction
-                processing_trxs = []
-                transaction_history = self.config.get_transaction_history()
-                logger.info(
-                    f"Current transaction history has {len(transaction_history)} transactions"
-                )
-
-                for trx_id, trx_data in transaction_history.items():
-                    logger.info(
-                        f"Transaction {trx_id}: status = {trx_data.get('status')}"
-                    )
-                    if trx_data.get("status") == "processing":
-                        processing_trxs.append((trx_id, trx_data["timestamp"]))
-
-                logger.info(f"Found {len(processing_trxs)} processing transactions")
-                if processing_trxs:
-                    # Get the most recent processing transaction
-                    latest_trx_id = max(processing_trxs, key=lambda x: x[1])[0]
+                # Find the latest processing transaction; the config keeps
+                # these indexed, so the full history is not scanned
+                latest_trx_id = self.config.get_latest_processing_transaction()
+                if latest_trx_id:
                     logger.info(f"Updating transaction {latest_trx_id} with response")
 
                     # Parse the raw response data
@@ -394,9 +382,7 @@ class TransactionProcessor:
         status_info = {
             "trxId": trx_id,
             "status": transaction["status"],
-            "timestamp": time.strftime(
-                "%Y-%m-%d %H:%M:%S", time.localtime(transaction["timestamp"])
-            ),
+            "timestamp": EcrUtils.format_local_timestamp(transaction["timestamp"]),
         }
 
         if "response" in transaction:
@@ -456,18 +442,48 @@ class ConnectionManager:
         self.serial_comm = serial_comm
         self.socket_comm = socket_comm
         self.config = config
-        self.is_connected = False
+        # Status is published as one immutable tuple (see STATUS_FIELDS) so
+        # readers get a consistent view with a single attribute load
+        self._status_snapshot = (False, True, True)
+        self._status_lock = threading.Lock()
+        self._network_check_lock = threading.Lock()
+        self._network_checked_at = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._status_snapshot[0]
+
+    @is_connected.setter
+    def is_connected(self, connected: bool):
+        with self._status_lock:
+            _, network_available, auto_disconnect = self._status_snapshot
+            self._status_snapshot = (connected, network_available, auto_disconnect)
 
     def get_connection_status(self) -> Dict[str, Any]:
         """Get current connection status"""
-        network_available = (
-            check_network_connectivity() if self.config.is_socket_mode() else True
-        )
-        return {
-            "connected": self.is_connected,
-            "network_available": network_available,
-            "auto_disconnect_on_offline": True,
-        }
+        snapshot = self._status_snapshot
+        if not self.config.is_socket_mode():
+            snapshot = (snapshot[0], True, snapshot[2])
+        elif time.monotonic() - self._network_checked_at >= NETWORK_CHECK_INTERVAL:
+            self._refresh_network_status()
+        return dict(zip(STATUS_FIELDS, snapshot))
+
+    def _refresh_network_status(self):
+        """Start a background network check unless one is already running"""
+        if not self._network_check_lock.acquire(blocking=False):
+            return
+        self._network_checked_at = time.monotonic()
+
+        def check():
+            try:
+                network_available = check_network_connectivity()
+                with self._status_lock:
+                    connected, _, auto_disconnect = self._status_snapshot
+                    self._status_snapshot = (connected, network_available, auto_disconnect)
+            finally:
+                self._network_check_lock.release()
+
+        threading.Thread(target=check, name="network-check", daemon=True).start()
 
     def connect(self) -> Dict[str, Any]:
         """Connect to the appropriate communication method"""
@@ -15,6 +15,11 @@ from .ecr_core import SerialData
 
 logger = logging.getLogger(__name__)
 
+# Port enumeration walks the OS device tree, so results are reused briefly
+PORTS_CACHE_TTL = 2.0
+_ports_cache = (0.0, None)
+_ports_cache_lock = threading.Lock()
+
 
 class SerialCommListener:
     """Serial communication listener - handles incoming serial data via PySerial"""
@@ -587,3 +592,18 @@ def get_available_ports():
     except Exception as e:
         logger.error(f"Error listing serial ports: {e}")
     return ports
+
+
+def get_cached_ports():
+    """Get available serial ports, reusing a listing up to PORTS_CACHE_TTL old"""
+    global _ports_cache
+    cached_at, ports = _ports_cache
+    if ports is not None and time.monotonic() - cached_at < PORTS_CACHE_TTL:
+        return ports
+    with _ports_cache_lock:
+        # Another thread may have refreshed the cache while we waited
+        cached_at, ports = _ports_cache
+        if ports is None or time.monotonic() - cached_at >= PORTS_CACHE_TTL:
+            ports = get_available_ports()
+            _ports_cache = (time.monotonic(), ports)
+        return ports
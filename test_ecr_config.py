@@ -0,0 +1,114 @@
+"""
+Transaction history tests for EcrConfig
+"""
+import os
+import sys
+import threading
+import time
+
+import orjson
+import pytest
+
+from src.routes import ecr_config
+from src.routes.ecr_config import EcrConfig
+
+
+def make_transaction(n: int, status: str = "processing") -> dict:
+    return {
+        "status": status,
+        "timestamp": time.time() + n,
+        "request": {"transType": "01", "amount": str(n), "invoiceNo": str(n)},
+    }
+
+
+def wait_for(condition, timeout: float = 5.0):
+    """Poll until the background flusher has done its work"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for history flush"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = EcrConfig(str(tmp_path))
+    yield config
+    config.close()
+
+
+def test_clear_ui_while_transactions_change(config):
+    stop = threading.Event()
+
+    def writer():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            config.add_transaction(f"T{n:06d}", make_transaction(n))
+            # Keep touching recent transactions so some get re-indexed
+            # right as they are being cleared
+            config.update_transaction(f"T{max(1, n - 3):06d}", {"status": "success"})
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(1000):
+            config.clear_ui_transaction_history()
+            config.get_history_items()
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(switch_interval)
+
+    visible = {item["id"] for item in config.get_history_items()}
+    assert not visible & config.ui_hidden_transactions
+    assert len(config._history_order) == len(config._history_items)
+
+
+def test_history_survives_restart(tmp_path, config):
+    for n in range(1, 6):
+        config.add_transaction(f"T{n:06d}", make_transaction(n), user_id=n % 2)
+    config.update_transaction("T000002", {"status": "success", "response": {"traceNo": "000002"}})
+    config.update_transaction("T000004", {"status": "failed"})
+    expected = orjson.loads(orjson.dumps(config.transaction_history))
+    config.close()
+
+    reloaded = EcrConfig(str(tmp_path))
+    try:
+        assert reloaded.transaction_history == expected
+    finally:
+        reloaded.close()
+
+
+def test_replay_skips_truncated_last_log_line(tmp_path, config):
+    for n in range(1, 4):
+        config.add_transaction(f"T{n:06d}", make_transaction(n))
+    config.update_transaction("T000003", {"status": "success"})
+    expected = orjson.loads(orjson.dumps(config.transaction_history))
+    wait_for(lambda: config._dirty_queue.empty() and not config._history_dirty)
+    with config._save_lock:
+        pass  # any append in progress has finished writing
+    assert os.path.getsize(config.history_log_file) > 0
+
+    # Simulate a crash in the middle of an append
+    with open(config.history_log_file, "ab") as f:
+        f.write(b'{"op":"put","id":"T000004","data":{"sta')
+
+    reloaded = EcrConfig(str(tmp_path))
+    try:
+        assert reloaded.transaction_history == expected
+    finally:
+        reloaded.close()
+
+
+def test_compaction_truncates_log(tmp_path, monkeypatch, config):
+    monkeypatch.setattr(ecr_config, "HISTORY_LOG_MIN_COMPACT", 1)
+    config.add_transaction("T000001", make_transaction(1))
+    config.update_transaction("T000001", {"status": "success"})
+
+    wait_for(lambda: os.path.exists(config.history_file))
+    wait_for(lambda: os.path.getsize(config.history_log_file) == 0)
+    with open(config.history_file, "rb") as f:
+        snapshot = orjson.loads(f.read())
+    assert snapshot == orjson.loads(orjson.dumps(config.transaction_history))
@@ -0,0 +1,65 @@
+"""
+Protocol packing tests for EcrCore - BRI FMS v3.3
+"""
+import ctypes
+import functools
+import operator
+
+import pytest
+
+from src.routes.ecr_core import EcrCore, ReqData
+
+
+@pytest.fixture
+def ecr_core(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISABLE_NATIVE_LIBRARY", "true")
+    return EcrCore(str(tmp_path))
+
+
+def expected_sale_frame(card_field: bytes) -> bytes:
+    """SALE of 100, invoice 1, built byte-by-byte as the baseline packer did"""
+    frame = (
+        b"\x02\x02\x00"
+        + bytes([0x01])
+        + b"000000010000"
+        + b"000000000000"
+        + b"000000000001"
+        + card_field
+        + b"\x00" * 144
+        + b"\x03"
+    )
+    return frame + bytes([functools.reduce(operator.xor, frame, 0)])
+
+
+def test_pack_manual_without_card_number(ecr_core):
+    packed = ecr_core.pack_request_message("01", "100", "1", None)
+
+    assert packed == expected_sale_frame(b"\x00" * 19)
+    assert packed[40:59] == b"\x00" * 19
+
+
+class FakeEcrLibrary:
+    """Stands in for BriEcrLibrary: records the ReqData it is asked to pack"""
+
+    def __init__(self):
+        self.requests = []
+
+    def ecrPackRequest(self, out_buf, req_ref):
+        req = bytes(req_ref._obj)
+        self.requests.append(req)
+        ctypes.memmove(out_buf, req, len(req))
+        return len(req)
+
+
+def test_pack_with_library_without_card_number(ecr_core):
+    ecr_core.ecr_lib = FakeEcrLibrary()
+    ecr_core.use_library = True
+
+    ecr_core.pack_request_message("01", "100", "1", None)
+
+    # The library path must have handled the request, not the manual fallback
+    assert len(ecr_core.ecr_lib.requests) == 1
+    req = ecr_core.ecr_lib.requests[0]
+    assert len(req) == ctypes.sizeof(ReqData)
+    assert req == expected_sale_frame(b"\x00" * 19)[3:203]
+    assert req[37:56] == b"\x00" * 19